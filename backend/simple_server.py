@@ -2,14 +2,105 @@
 Simplified working server for القاموس المحيط
 """
 from http.server import HTTPServer, SimpleHTTPRequestHandler
+import gzip
 import json
 import sqlite3
-from urllib.parse import urlparse, parse_qs
+from urllib.parse import urlparse, parse_qs, unquote
 import os
+import sys
+
+try:
+    import brotli  # optional: gzip only without it
+except ImportError:
+    brotli = None
 
 DATABASE_PATH = 'qamoos_database.sqlite'
 # Get parent directory for HTML files
 PARENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PARENT_DIR)
+from static_assets import STATIC_ROOT, StaticAssetCache  # noqa: E402
+from server_metrics import METRICS_ENABLED, Metrics, RequestTimer, search_mode_label, timed  # noqa: E402
+
+# Pages and assets, read once and re-read when a file changes
+static_assets = StaticAssetCache(STATIC_ROOT, reload=True).load()
+
+# Clean URLs for the site's pages
+PAGE_ALIASES = {
+    '/': 'index.html',
+    '/search': 'search.html',
+    '/poetry': 'poetry.html',
+    '/about': 'about.html',
+    '/privacy': 'privacy.html',
+    '/methodology': 'methodology.html',
+    '/sources': 'sources.html',
+    '/terms': 'terms.html',
+    '/contact': 'contact.html',
+}
+
+# JSON response compression (same settings as server_postgresql.py)
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', 1024))
+COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', 6))
+COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', 5))
+
+def negotiate_encoding(accept_encoding):
+    """'br', 'gzip' or None for an Accept-Encoding header; q-values decide, br wins a tie"""
+    qualities = {}
+    for item in (accept_encoding or '').split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[name.strip().lower()] = quality
+    
+    best, best_quality = None, 0.0
+    for encoding in (['br', 'gzip'] if brotli is not None else ['gzip']):
+        quality = qualities.get(encoding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+# Server-Timing headers and /metrics (METRICS_ENABLED, see server_metrics.py)
+metrics = Metrics()
+API_ROUTES = {'/api/dictionaries', '/api/stats', '/api/chapters', '/api/search'}
+
+def route_label(path):
+    """Metrics label of a request path (the route names server_postgresql.py reports)"""
+    if path in API_ROUTES or path == '/metrics':
+        return path
+    if path.startswith('/api/browse/'):
+        return '/api/browse/{chapter}'
+    if path.startswith('/api/'):
+        return 'other'
+    return path if path in PAGE_ALIASES else '/{path}'
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that adds statement and fetch time to its connection's RequestTimer"""
+    
+    def execute(self, sql, parameters=()):
+        timer = self.connection.timer
+        if timer is not None:
+            timer.queries += 1
+        with timed(timer, 'sql'):
+            return super().execute(sql, parameters)
+    
+    def fetchone(self):
+        with timed(self.connection.timer, 'fetch'):
+            return super().fetchone()
+    
+    def fetchall(self):
+        with timed(self.connection.timer, 'fetch'):
+            return super().fetchall()
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3 connection handing out TimedCursors"""
+    timer = None
+    
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
 
 def normalize_arabic(text):
     """Remove Arabic diacritics for normalized search - MUST MATCH extraction script"""
@@ -40,8 +131,11 @@ def normalize_arabic(text):
     return text.strip()
 
 class DictionaryHandler(SimpleHTTPRequestHandler):
+    timer = None
+    status = None
     
     def do_GET(self):
+        self.timer = RequestTimer() if METRICS_ENABLED else None
         try:
             self._do_GET_impl()
         except Exception as e:
@@ -49,159 +143,43 @@ class DictionaryHandler(SimpleHTTPRequestHandler):
             import traceback
             traceback.print_exc()
             self.send_error(500, f"Internal Server Error: {e}")
+        finally:
+            if self.timer is not None:
+                parsed = urlparse(self.path)
+                route = route_label(parsed.path)
+                mode = ''
+                if route == '/api/search':
+                    mode = search_mode_label(parse_qs(parsed.query).get('mode', ['all'])[0])
+                metrics.observe_request(route, mode, self.status or 500, self.timer)
+    
+    def send_response(self, code, message=None):
+        self.status = code
+        super().send_response(code, message)
+    
+    def end_headers(self):
+        if self.timer is not None:
+            self.send_header('Server-Timing', self.timer.server_timing())
+        super().end_headers()
+    
+    def connect_db(self):
+        """Open the database; its statements are timed for this request's Server-Timing"""
+        with timed(self.timer, 'connect'):
+            conn = sqlite3.connect(DATABASE_PATH, factory=TimedConnection)
+        conn.timer = self.timer
+        return conn
     
     def _do_GET_impl(self):
         parsed = urlparse(self.path)
         print(f"📥 Request: {parsed.path}")  # Debug logging
         
-        # Serve main page (new professional design)
-        if parsed.path == '/' or parsed.path == '':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html; charset=utf-8')
-            self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
-            self.send_header('Pragma', 'no-cache')
-            self.send_header('Expires', '0')
-            self.end_headers()
-            with open(os.path.join(PARENT_DIR, 'index_professional.html'), 'rb') as f:
-                self.wfile.write(f.read())
-            return
-        
-        # Serve search page
-        if parsed.path == '/search' or parsed.path == '/search.html':
-            try:
-                self.send_response(200)
-                self.send_header('Content-type', 'text/html; charset=utf-8')
-                self.end_headers()
-                with open(os.path.join(PARENT_DIR, 'search.html'), 'rb') as f:
-                    self.wfile.write(f.read())
-            except FileNotFoundError:
-                # Redirect to main page if search.html doesn't exist
-                self.send_response(302)
-                self.send_header('Location', '/')
-                self.end_headers()
-            return
-        
-        # Serve about page
-        if parsed.path == '/about' or parsed.path == '/about.html':
-            try:
-                self.send_response(200)
-                self.send_header('Content-type', 'text/html; charset=utf-8')
-                self.end_headers()
-                with open(os.path.join(PARENT_DIR, 'about.html'), 'rb') as f:
-                    self.wfile.write(f.read())
-            except FileNotFoundError:
-                self.send_error(404, "Page not found")
+        if parsed.path == '/metrics' and METRICS_ENABLED:
+            self.send_metrics()
             return
         
-        # Serve privacy page
-        if parsed.path == '/privacy' or parsed.path == '/privacy.html':
-            try:
-                self.send_response(200)
-                self.send_header('Content-type', 'text/html; charset=utf-8')
-                self.end_headers()
-                with open(os.path.join(PARENT_DIR, 'privacy.html'), 'rb') as f:
-                    self.wfile.write(f.read())
-            except FileNotFoundError:
-                self.send_error(404, "Page not found")
-            return
-        
-        # Serve methodology page
-        if parsed.path == '/methodology' or parsed.path == '/methodology.html':
-            try:
-                self.send_response(200)
-                self.send_header('Content-type', 'text/html; charset=utf-8')
-                self.end_headers()
-                with open(os.path.join(PARENT_DIR, 'methodology.html'), 'rb') as f:
-                    self.wfile.write(f.read())
-                return
-            except Exception as e:
-                print(f"❌ Error serving methodology.html: {e}")
-                self.send_error(500, f"Error loading page: {e}")
-                return
-        
-        # Serve sources page
-        if parsed.path == '/sources' or parsed.path == '/sources.html':
-            try:
-                self.send_response(200)
-                self.send_header('Content-type', 'text/html; charset=utf-8')
-                self.end_headers()
-                with open(os.path.join(PARENT_DIR, 'sources.html'), 'rb') as f:
-                    self.wfile.write(f.read())
-                return
-            except Exception as e:
-                print(f"❌ Error serving sources.html: {e}")
-                self.send_error(500, f"Error loading page: {e}")
-                return
-        
-        # Serve terms page
-        if parsed.path == '/terms' or parsed.path == '/terms.html':
-            try:
-                self.send_response(200)
-                self.send_header('Content-type', 'text/html; charset=utf-8')
-                self.end_headers()
-                with open(os.path.join(PARENT_DIR, 'terms.html'), 'rb') as f:
-                    self.wfile.write(f.read())
-                return
-            except Exception as e:
-                print(f"❌ Error serving terms.html: {e}")
-                self.send_error(500, f"Error loading page: {e}")
-                return
-        
-        # Serve contact page
-        if parsed.path == '/contact' or parsed.path == '/contact.html':
-            try:
-                self.send_response(200)
-                self.send_header('Content-type', 'text/html; charset=utf-8')
-                self.end_headers()
-                with open(os.path.join(PARENT_DIR, 'contact.html'), 'rb') as f:
-                    self.wfile.write(f.read())
-                return
-            except Exception as e:
-                print(f"❌ Error serving contact.html: {e}")
-                self.send_error(500, f"Error loading page: {e}")
-                return
-        
-        # Serve PWA manifest
-        if parsed.path == '/manifest.json':
-            try:
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                with open(os.path.join(PARENT_DIR, 'manifest.json'), 'rb') as f:
-                    self.wfile.write(f.read())
-            except FileNotFoundError:
-                self.send_error(404, "Manifest not found")
-            return
-        
-        # Serve service worker
-        if parsed.path == '/service-worker.js':
-            try:
-                self.send_response(200)
-                self.send_header('Content-type', 'application/javascript')
-                self.send_header('Service-Worker-Allowed', '/')
-                self.end_headers()
-                with open(os.path.join(PARENT_DIR, 'service-worker.js'), 'rb') as f:
-                    self.wfile.write(f.read())
-            except FileNotFoundError:
-                self.send_error(404, "Service worker not found")
-            return
-        
-        # Serve sitemap
-        if parsed.path == '/sitemap.xml':
-            self.send_response(200)
-            self.send_header('Content-type', 'application/xml')
-            self.end_headers()
-            with open('sitemap.xml', 'rb') as f:
-                self.wfile.write(f.read())
-            return
-        
-        # Serve robots.txt
-        if parsed.path == '/robots.txt':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/plain')
-            self.end_headers()
-            with open('robots.txt', 'rb') as f:
-                self.wfile.write(f.read())
+        # Pages and assets (frontend-deploy) from the in-memory cache
+        if not parsed.path.startswith('/api/'):
+            path = unquote(parsed.path) or '/'
+            self.send_static(PAGE_ALIASES.get(path, path))
             return
         
         # API endpoints
@@ -221,7 +199,7 @@ class DictionaryHandler(SimpleHTTPRequestHandler):
     
     def handle_dictionaries(self):
         """Get list of available dictionaries"""
-        conn = sqlite3.connect(DATABASE_PATH)
+        conn = self.connect_db()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -241,15 +219,43 @@ class DictionaryHandler(SimpleHTTPRequestHandler):
         self.send_json(dictionaries)
     
     def handle_stats(self, params):
-        """Get statistics, optionally filtered by dictionary_id"""
+        """
+        Get statistics, optionally filtered by dictionary_id.
+        Reads the precomputed dictionary_stats table (refreshed at import time,
+        or with `python extract_dictionary_v2.py --refresh-stats`); falls back
+        to counting rows if the table does not exist yet.
+        """
         dictionary_id = params.get('dictionary_id', [None])[0]
+        dict_id = int(dictionary_id) if dictionary_id and dictionary_id != 'all' else 0  # 0 = all
         
-        conn = sqlite3.connect(DATABASE_PATH)
+        conn = self.connect_db()
         cursor = conn.cursor()
         
-        if dictionary_id and dictionary_id != 'all':
-            # Stats for specific dictionary
-            dict_id = int(dictionary_id)
+        try:
+            cursor.execute('''
+                SELECT entry_count, definition_count, chapter_count, min_page, max_page
+                FROM dictionary_stats
+                WHERE dictionary_id = ?
+            ''', (dict_id,))
+            row = cursor.fetchone()
+            total_entries, total_definitions, total_chapters, min_page, max_page = row or (0, 0, 0, None, None)
+        except sqlite3.OperationalError:
+            total_entries, total_definitions, total_chapters, min_page, max_page = self.count_stats(cursor, dict_id)
+        
+        conn.close()
+        
+        data = {
+            'total_entries': total_entries,
+            'total_definitions': total_definitions,
+            'total_chapters': total_chapters,
+            'page_range': {'min': min_page, 'max': max_page}
+        }
+        
+        self.send_json(data)
+    
+    def count_stats(self, cursor, dict_id):
+        """Count statistics live (slow path for databases without dictionary_stats)"""
+        if dict_id:
             cursor.execute('SELECT COUNT(*) FROM entries WHERE dictionary_id = ?', (dict_id,))
             total_entries = cursor.fetchone()[0]
             
@@ -262,7 +268,6 @@ class DictionaryHandler(SimpleHTTPRequestHandler):
             cursor.execute('SELECT MIN(page_number), MAX(page_number) FROM entries WHERE dictionary_id = ? AND page_number IS NOT NULL', (dict_id,))
             min_page, max_page = cursor.fetchone()
         else:
-            # Stats for all dictionaries
             cursor.execute('SELECT COUNT(*) FROM entries')
             total_entries = cursor.fetchone()[0]
             
@@ -275,22 +280,13 @@ class DictionaryHandler(SimpleHTTPRequestHandler):
             cursor.execute('SELECT MIN(page_number), MAX(page_number) FROM entries WHERE page_number IS NOT NULL')
             min_page, max_page = cursor.fetchone()
         
-        conn.close()
-        
-        data = {
-            'total_entries': total_entries,
-            'total_definitions': total_definitions,
-            'total_chapters': total_chapters,
-            'page_range': {'min': min_page, 'max': max_page}
-        }
-        
-        self.send_json(data)
+        return total_entries, total_definitions, total_chapters, min_page, max_page
     
     def handle_chapters(self, params):
         """Get chapters, optionally filtered by dictionary_id"""
         dictionary_id = params.get('dictionary_id', [None])[0]
         
-        conn = sqlite3.connect(DATABASE_PATH)
+        conn = self.connect_db()
         cursor = conn.cursor()
         
         if dictionary_id and dictionary_id != 'all':
@@ -329,7 +325,7 @@ class DictionaryHandler(SimpleHTTPRequestHandler):
             self.send_json({'error': 'Query required'}, 400)
             return
         
-        conn = sqlite3.connect(DATABASE_PATH)
+        conn = self.connect_db()
         cursor = conn.cursor()
         
         query_norm = normalize_arabic(query)
@@ -466,7 +462,7 @@ class DictionaryHandler(SimpleHTTPRequestHandler):
         limit = min(int(params.get('limit', ['100'])[0]), 200)
         dictionary_id = params.get('dictionary_id', [None])[0]
         
-        conn = sqlite3.connect(DATABASE_PATH)
+        conn = self.connect_db()
         cursor = conn.cursor()
         
         if dictionary_id and dictionary_id != 'all':
@@ -689,12 +685,67 @@ class DictionaryHandler(SimpleHTTPRequestHandler):
             'full_text': row[8] or ''
         }
     
+    def send_static(self, path):
+        """Serve a cached asset: precompressed variant per Accept-Encoding, 304 on a matching ETag"""
+        asset = static_assets.get(path)
+        if asset is None:
+            self.send_error(404, "File not found")
+            return
+        
+        encoding, body, etag = asset.select(negotiate_encoding(self.headers.get('Accept-Encoding')))
+        not_modified = asset.is_current(self.headers.get('If-None-Match'))
+        
+        self.send_response(304 if not_modified else 200)
+        content_type = asset.mimetype
+        if content_type.startswith('text/') or content_type in ('application/json', 'application/javascript'):
+            content_type += '; charset=utf-8'
+        self.send_header('Content-type', content_type)
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', asset.cache_control)
+        if asset.negotiated:
+            self.send_header('Vary', 'Accept-Encoding')
+        if asset.path == 'service-worker.js':
+            self.send_header('Service-Worker-Allowed', '/')
+        if not_modified:
+            self.end_headers()
+            return
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
     def send_json(self, data, status=200):
+        with timed(self.timer, 'json'):
+            body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        encoding = None
+        if len(body) >= COMPRESS_MIN_BYTES:
+            encoding = negotiate_encoding(self.headers.get('Accept-Encoding'))
+        if encoding:
+            with timed(self.timer, 'compress'):
+                if encoding == 'br':
+                    body = brotli.compress(body, quality=COMPRESS_BROTLI_QUALITY)
+                else:
+                    body = gzip.compress(body, COMPRESS_GZIP_LEVEL)
+        
         self.send_response(status)
         self.send_header('Content-type', 'application/json; charset=utf-8')
         self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_metrics(self):
+        """Request latency and phase timings in the Prometheus text format"""
+        body = metrics.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
         self.end_headers()
-        self.wfile.write(json.dumps(data, ensure_ascii=False).encode('utf-8'))
+        self.wfile.write(body)
 
 if __name__ == '__main__':
     if not os.path.exists(DATABASE_PATH):
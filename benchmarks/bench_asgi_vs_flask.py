@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Flask (server_postgresql.py) vs ASGI (server_asgi.py)
+================================================================
+
+Sends the same request mix to both servers at a fixed client concurrency
+and prints throughput, latency percentiles and error counts side by side.
+Both servers must already be running against the same database. Disable
+the search cache on both so every search reaches PostgreSQL:
+
+    SEARCH_CACHE_SIZE=0 gunicorn --bind :5000 --workers 2 --threads 4 server_postgresql:app
+    SEARCH_CACHE_SIZE=0 uvicorn server_asgi:app --port 8000 --workers 2
+
+    python benchmarks/bench_asgi_vs_flask.py --concurrency 32 --requests 2000
+
+The client is a thread pool with one keep-alive connection per thread, so
+it has no dependencies beyond the standard library.
+"""
+
+import argparse
+import http.client
+import statistics
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_PATHS = [
+    '/api/search?q=كتب',
+    '/api/search?q=علم&mode=starts',
+    '/api/search?q=قمر&mode=fts',
+    '/api/search?q=كتاب&dictionary_id=3',
+    '/api/entry/1',
+    '/api/entry/100',
+    '/api/poem/1',
+    '/api/poets?limit=20',
+    '/api/poetry/search?q=حبيب&limit=10',
+]
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def run_load(base_url, paths, total_requests, concurrency):
+    """Issue total_requests GETs (cycling through paths); return (elapsed_s, latencies_ms, errors)"""
+    parsed = urllib.parse.urlsplit(base_url)
+    local = threading.local()
+    counter = iter(range(total_requests))
+    counter_lock = threading.Lock()
+    latencies = []
+    errors = []
+
+    def connection():
+        if not hasattr(local, 'conn'):
+            local.conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=60)
+        return local.conn
+
+    def worker():
+        while True:
+            with counter_lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            path = urllib.parse.quote(paths[i % len(paths)], safe='/?=&')
+            start = time.perf_counter()
+            try:
+                conn = connection()
+                conn.request('GET', path)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException) as e:
+                local.__dict__.pop('conn', None)
+                errors.append(str(e))
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+            if status >= 400:
+                errors.append(f'HTTP {status} {path}')
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    elapsed = time.perf_counter() - start
+    return elapsed, sorted(latencies), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Flask and ASGI servers side by side')
+    parser.add_argument('--flask-url', default='http://localhost:5000')
+    parser.add_argument('--asgi-url', default='http://localhost:8000')
+    parser.add_argument('--concurrency', type=int, default=32, help='concurrent client connections (default: 32)')
+    parser.add_argument('--requests', type=int, default=1000, help='requests per server (default: 1000)')
+    parser.add_argument('--warmup', type=int, default=50, help='untimed requests per server first (default: 50)')
+    parser.add_argument('paths', nargs='*', default=DEFAULT_PATHS)
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("Flask vs ASGI benchmark")
+    print("=" * 80)
+    print(f"Requests: {args.requests}   concurrency: {args.concurrency}   paths: {len(args.paths)}")
+    print()
+    print(f"{'server':<8} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'mean ms':>9} {'errors':>7}")
+    print("-" * 80)
+
+    for name, url in (('flask', args.flask_url), ('asgi', args.asgi_url)):
+        run_load(url, args.paths, args.warmup, min(args.concurrency, args.warmup or 1))
+        elapsed, latencies, errors = run_load(url, args.paths, args.requests, args.concurrency)
+        if not latencies:
+            print(f"{name:<8} no successful requests ({errors[0] if errors else 'unknown error'})")
+            continue
+        print(f"{name:<8} {len(latencies) / elapsed:>9.1f} {percentile(latencies, 0.50):>9.1f} "
+              f"{percentile(latencies, 0.95):>9.1f} {percentile(latencies, 0.99):>9.1f} "
+              f"{statistics.mean(latencies):>9.1f} {len(errors):>7}")
+        for error in sorted(set(errors))[:3]:
+            print(f"         {error}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: prepared vs. unprepared hot statements
+=================================================
+
+Runs each statement that server_postgresql.py executes through
+CountingCursor.execute_prepared (the search statement per mode, tier 1,
+the entry and its definitions, the definitions batch) two ways on a real
+database:
+
+    plain       - cursor.execute(): parsed, analyzed and planned every call
+    prepared    - PREPARE once, then EXECUTE, as the pooled connections do
+
+and prints, per statement, the median and p95 wall time per call and the
+server's own planning time (EXPLAIN ANALYZE 'Planning Time', which for a
+prepared statement is only spent while PostgreSQL still makes custom
+plans), plus how many of the prepared executions used the cached generic
+plan. The queries cycle through the word list, so the plan cache sees
+varying values rather than one repeated call.
+
+Usage:
+    python benchmarks/bench_prepared.py --runs 200
+    python benchmarks/bench_prepared.py --runs 200 كتب علم قمر
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import psycopg2
+import psycopg2.extensions
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from server_postgresql import (  # noqa: E402
+    DATABASE_URL, DEFINITIONS_BATCH_SQL, ENTRY_DEFINITIONS_SQL, ENTRY_SQL, SEARCH_DEFINITIONS_PER_ENTRY,
+    CountingCursor, PreparingConnection, build_search_query, build_tier1_query, normalize_arabic,
+)
+
+DEFAULT_QUERIES = ['كتب', 'نزه', 'علم', 'الحب', 'قمر', 'سماء', 'مكتوب']
+
+
+def statements(words, entry_ids, limit):
+    """name -> one (sql, params) per word / id, as the server builds them"""
+    cases = {
+        f'search {mode}': [build_search_query(q, None, mode, limit) for q in words]
+        for mode in ('exact', 'starts', 'fts', 'all')
+    }
+    cases['search all (dict 3)'] = [build_search_query(q, '3', 'all', limit) for q in words]
+    cases['tier 1'] = [build_tier1_query(q, 'all', limit) for q in words]
+    cases['entry'] = [(ENTRY_SQL, (entry_id,)) for entry_id in entry_ids]
+    cases['entry definitions'] = [(ENTRY_DEFINITIONS_SQL, (entry_id,)) for entry_id in entry_ids]
+    cases['definitions batch'] = [(DEFINITIONS_BATCH_SQL, (entry_ids, SEARCH_DEFINITIONS_PER_ENTRY))]
+    return cases
+
+
+def time_calls(execute, cursor, variants, runs):
+    timings = []
+    for i in range(runs):
+        sql, params = variants[i % len(variants)]
+        start = time.perf_counter()
+        execute(sql, params)
+        cursor.fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    return statistics.median(timings), p95
+
+
+def planning_ms(plain, statement, params):
+    plain.execute('EXPLAIN (ANALYZE, FORMAT JSON) ' + statement, params)
+    return plain.fetchone()[0][0]['Planning Time']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark prepared vs. unprepared hot statements')
+    parser.add_argument('--runs', type=int, default=100, help='timed calls per statement and way (default: 100)')
+    parser.add_argument('--limit', type=int, default=50, help='LIMIT per search (default: 50)')
+    parser.add_argument('queries', nargs='*', default=DEFAULT_QUERIES)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(DATABASE_URL, connection_factory=PreparingConnection, cursor_factory=CountingCursor)
+    conn.autocommit = True
+    cursor = conn.cursor()
+    cursor.execute('SET search_path TO public')
+    plain = conn.cursor(cursor_factory=psycopg2.extensions.cursor)
+
+    words = [normalize_arabic(q) for q in args.queries]
+    plain.execute('SELECT entry_id FROM entries ORDER BY entry_id LIMIT 50')
+    entry_ids = [row[0] for row in plain.fetchall()]
+
+    print("=" * 80)
+    print("Prepared statement benchmark")
+    print("=" * 80)
+    print(f"Queries: {len(words)}   runs: {args.runs}   limit: {args.limit}")
+    print()
+    print(f"{'statement':<20} {'way':<9} {'median ms':>10} {'p95 ms':>8} {'planning ms':>12}  generic plans")
+    print("-" * 80)
+
+    for name, variants in statements(words, entry_ids, args.limit).items():
+        sql, params = variants[0]
+        plain_median, plain_p95 = time_calls(cursor.execute, cursor, variants, args.runs)
+        plain_planning = planning_ms(plain, sql, params)
+        print(f"{name:<20} {'plain':<9} {plain_median:>10.3f} {plain_p95:>8.3f} {plain_planning:>12.3f}")
+
+        median, p95 = time_calls(cursor.execute_prepared, cursor, variants, args.runs)
+        statement = conn.prepared[sql]
+        placeholders = ', '.join(['%s'] * len(params))
+        prepared_planning = planning_ms(plain, f'EXECUTE {statement} ({placeholders})', params)
+        plain.execute('SELECT generic_plans, custom_plans FROM pg_prepared_statements WHERE name = %s',
+                      (statement,))
+        generic, custom = plain.fetchone()
+        print(f"{'':<20} {'prepared':<9} {median:>10.3f} {p95:>8.3f} {prepared_planning:>12.3f}  "
+              f"{generic}/{generic + custom}   ({(median / plain_median - 1) * 100:+.0f}% median)")
+
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
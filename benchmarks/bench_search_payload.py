@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: /api/search payload size by fieldset
+===============================================
+
+Runs run_search() from server_postgresql.py for a set of queries and
+modes and reports the size of the JSON body /api/search would send
+(raw and gzip -6) with:
+
+    all      fields=all, every column (the payload before fields= existed)
+    default  no fields= parameter: ids, headword, root, dictionary,
+             snippet and definitions
+    minimal  fields=entry_id,sub_entry_id,headword,snippet
+
+Usage:
+    python benchmarks/bench_search_payload.py
+    python benchmarks/bench_search_payload.py --limit 200 --dictionary-id 3 كتب علم
+"""
+
+import argparse
+import gzip
+import os
+import sys
+import time
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from server_postgresql import (  # noqa: E402
+    DATABASE_URL, app, normalize_arabic, parse_search_fields, run_search,
+)
+
+DEFAULT_QUERIES = ['كتب', 'علم', 'قمر', 'الحب', 'سماء', 'نزه']
+MODES = ['all', 'exact', 'starts', 'fts']
+FIELDSETS = [
+    ('all', 'all'),
+    ('default', None),
+    ('minimal', 'entry_id,sub_entry_id,headword,snippet'),
+]
+
+
+def payload_bytes(payload, query):
+    """The /api/search response body for payload, as jsonify() encodes it"""
+    return app.json.dumps(dict(payload, query=query)).encode('utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare /api/search payload sizes per fieldset')
+    parser.add_argument('--limit', type=int, default=50, help='results per search (default: 50)')
+    parser.add_argument('--dictionary-id', default=None, help="dictionary filter (default: all)")
+    parser.add_argument('queries', nargs='*', default=DEFAULT_QUERIES)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor)
+    conn.autocommit = True
+    cursor = conn.cursor()
+    cursor.execute('SET search_path TO public')
+
+    print("=" * 80)
+    print("/api/search payload size benchmark")
+    print("=" * 80)
+    print(f"Queries: {len(args.queries)}   modes: {', '.join(MODES)}   limit: {args.limit}   "
+          f"dictionary: {args.dictionary_id or 'all'}")
+    print()
+    print(f"{'fieldset':<10} {'results':>8} {'total KB':>10} {'KB/search':>10} "
+          f"{'gzip KB':>9} {'max KB':>9} {'ms/search':>10}")
+    print("-" * 80)
+
+    baseline = None
+    for name, value in FIELDSETS:
+        fields = parse_search_fields(value)
+        total = compressed = largest = results = 0
+        searches = 0
+        start = time.perf_counter()
+        for raw in args.queries:
+            query_norm = normalize_arabic(raw)
+            for mode in MODES:
+                payload = run_search(cursor, query_norm, args.dictionary_id, mode, args.limit, fields=fields)
+                body = payload_bytes(payload, raw)
+                total += len(body)
+                compressed += len(gzip.compress(body, 6))
+                largest = max(largest, len(body))
+                results += payload['count']
+                searches += 1
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if baseline is None:
+            baseline = total
+
+        print(f"{name:<10} {results:>8} {total / 1024:>10.1f} {total / 1024 / searches:>10.1f} "
+              f"{compressed / 1024:>9.1f} {largest / 1024:>9.1f} {elapsed_ms / searches:>10.1f}"
+              + (f"   ({100 * total / baseline:.0f}% of all)" if total != baseline else ''))
+
+
+if __name__ == '__main__':
+    main()
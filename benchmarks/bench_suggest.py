@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: in-memory headword autocomplete
+==========================================
+
+Builds the HeadwordIndex behind /api/suggest from the database (or from a
+synthetic corpus with --synthetic N) and reports:
+
+    * build time and memory footprint of the index
+    * suggest() latency per prefix length (median / p99, microseconds)
+    * for comparison, the tier-2 mode=starts statement /api/search runs
+      for the same prefixes (skipped with --synthetic)
+
+Usage:
+    python benchmarks/bench_suggest.py --runs 2000
+    python benchmarks/bench_suggest.py --synthetic 500000
+"""
+
+import argparse
+import random
+import statistics
+import os
+import sys
+import time
+
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from server_postgresql import (  # noqa: E402
+    DATABASE_URL, HEADWORD_INDEX_SQL, HeadwordIndex, build_tier2_query,
+)
+
+ARABIC_LETTERS = 'ابتثجحخدذرزسشصضطظعغفقكلمنهوي'
+
+
+def synthetic_rows(count, seed=1):
+    rng = random.Random(seed)
+    for _ in range(count):
+        word = ''.join(rng.choice(ARABIC_LETTERS) for _ in range(rng.randint(3, 9)))
+        yield word, word, rng.randint(1, 9)
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the /api/suggest headword index')
+    parser.add_argument('--runs', type=int, default=1000, help='lookups per prefix length (default: 1000)')
+    parser.add_argument('--limit', type=int, default=10, help='suggestions per lookup (default: 10)')
+    parser.add_argument('--synthetic', type=int, default=0, metavar='N',
+                        help='build from N random headwords instead of the database')
+    args = parser.parse_args()
+
+    cursor = None
+    if args.synthetic:
+        rows = list(synthetic_rows(args.synthetic))
+    else:
+        conn = psycopg2.connect(DATABASE_URL)
+        conn.autocommit = True
+        cursor = conn.cursor()
+        cursor.execute('SET search_path TO public')
+        cursor.execute(HEADWORD_INDEX_SQL)
+        rows = cursor.fetchall()
+
+    index = HeadwordIndex(rows)
+    keys = [index._key(i) for i in range(index.size)]
+
+    print("=" * 80)
+    print("Headword autocomplete benchmark")
+    print("=" * 80)
+    print(f"Source rows: {len(rows):,}   distinct headwords: {index.size:,}   "
+          f"memory: {index.memory_bytes() / 1024 / 1024:.1f} MB   build: {index.build_ms:,.0f} ms")
+    print()
+    print(f"{'prefix len':<11} {'suggest median us':>18} {'suggest p99 us':>15} {'sql starts median ms':>22}")
+    print("-" * 80)
+
+    rng = random.Random(2)
+    for length in (1, 2, 3, 4):
+        prefixes = [k[:length] for k in rng.sample(keys, min(len(keys), args.runs)) if len(k) >= length]
+        timings = []
+        for prefix in prefixes:
+            start = time.perf_counter()
+            index.suggest(prefix, args.limit)
+            timings.append((time.perf_counter() - start) * 1e6)
+        timings.sort()
+
+        sql_ms = ''
+        if cursor is not None:
+            sql_timings = []
+            for prefix in prefixes[:50]:
+                sql, params = build_tier2_query('starts', prefix, '', [], args.limit)
+                start = time.perf_counter()
+                cursor.execute(sql, params)
+                cursor.fetchall()
+                sql_timings.append((time.perf_counter() - start) * 1000)
+            sql_ms = f"{statistics.median(sql_timings):.2f}"
+
+        print(f"{length:<11} {statistics.median(timings):>18.1f} {percentile(timings, 0.99):>15.1f} {sql_ms:>22}")
+
+
+if __name__ == '__main__':
+    main()
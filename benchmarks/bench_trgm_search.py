@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: trigram-indexed contains search
+==========================================
+
+Times the tier-2 'all' search statement on a real (full-size) database in
+three configurations:
+
+    legacy      - the original six-way OR / LIKE chain
+    trgm        - build_tier2_query() from server_postgresql.py
+    trgm+sim    - same, ordered by trigram similarity
+
+Each statement is also run with index scans disabled (`--no-index`) to
+show the sequential-scan baseline the migration replaces. The plan's
+scan nodes are printed so you can confirm the GIN indexes are used.
+
+Usage:
+    psql "$DATABASE_URL" -f migrations/001_trgm_search_indexes.sql
+    python benchmarks/bench_trgm_search.py --runs 20
+    python benchmarks/bench_trgm_search.py --no-index --runs 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from server_postgresql import DATABASE_URL, build_tier2_query, normalize_arabic  # noqa: E402
+
+DEFAULT_QUERIES = ['كتب', 'نزه', 'علم', 'الحب', 'قمر', 'سماء', 'مكتوب']
+
+LEGACY_SQL = '''
+    SELECT DISTINCT e.entry_id, e.headword, e.root, e.full_text,
+           d.name_arabic as dictionary_name, e.dictionary_id, 2 as tier,
+           (CASE
+            WHEN e.headword_normalized = %s THEN 1
+            WHEN e.headword_normalized LIKE %s THEN 2
+            WHEN e.root = %s THEN 3
+            WHEN e.root LIKE %s THEN 4
+            WHEN e.headword_normalized LIKE %s THEN 5
+            ELSE 6
+           END) as rank,
+           LENGTH(e.headword) as hw_length
+    FROM entries e
+    JOIN dictionaries d ON e.dictionary_id = d.dictionary_id
+    WHERE (
+        e.headword_normalized = %s
+        OR e.headword_normalized LIKE %s
+        OR e.headword_normalized LIKE %s
+        OR e.root = %s
+        OR e.root LIKE %s
+        OR e.full_text LIKE %s
+    )
+    ORDER BY rank ASC, hw_length ASC
+    LIMIT %s
+'''
+
+
+def legacy_query(q, limit):
+    params = [q, q + '%', q, q + '%', '%' + q + '%',
+              q, q + '%', '%' + q + '%', q, '%' + q + '%', '%' + q + '%', limit]
+    return LEGACY_SQL, params
+
+
+def scan_nodes(plan):
+    """Collect 'Node Type (index)' labels for every scan in a JSON plan"""
+    nodes = []
+    node_type = plan.get('Node Type', '')
+    if 'Scan' in node_type:
+        label = node_type
+        if plan.get('Index Name'):
+            label += f" ({plan['Index Name']})"
+        elif plan.get('Relation Name'):
+            label += f" ({plan['Relation Name']})"
+        nodes.append(label)
+    for child in plan.get('Plans', []):
+        nodes.extend(scan_nodes(child))
+    return nodes
+
+
+def time_statement(cursor, sql, params, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    return statistics.median(timings), p95
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark trigram-indexed contains search')
+    parser.add_argument('--runs', type=int, default=10, help='timed runs per query (default: 10)')
+    parser.add_argument('--limit', type=int, default=50, help='LIMIT per search (default: 50)')
+    parser.add_argument('--no-index', action='store_true', help='disable index and bitmap scans')
+    parser.add_argument('queries', nargs='*', default=DEFAULT_QUERIES)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(DATABASE_URL)
+    conn.autocommit = True
+    cursor = conn.cursor()
+    cursor.execute('SET search_path TO public')
+    if args.no_index:
+        cursor.execute('SET enable_indexscan = off')
+        cursor.execute('SET enable_bitmapscan = off')
+
+    cursor.execute('SELECT COUNT(*) FROM entries')
+    total = cursor.fetchone()[0]
+    cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+    has_trgm = cursor.fetchone() is not None
+
+    print("=" * 80)
+    print("Trigram contains-search benchmark")
+    print("=" * 80)
+    print(f"Entries: {total:,}   runs: {args.runs}   limit: {args.limit}   "
+          f"indexes: {'disabled' if args.no_index else 'enabled'}   pg_trgm: {'yes' if has_trgm else 'NO'}")
+    if not has_trgm:
+        print("pg_trgm is not installed: every variant scans entries sequentially, "
+              "and trgm+sim is skipped")
+    print()
+    print(f"{'query':<10} {'variant':<10} {'median ms':>10} {'p95 ms':>10}  scans")
+    print("-" * 80)
+
+    for raw in args.queries:
+        q = normalize_arabic(raw)
+        variants = [
+            ('legacy', legacy_query(q, args.limit)),
+            # full_text=True so every variant returns the same columns as legacy
+            ('trgm', build_tier2_query('all', q, '', [], args.limit, full_text=True)),
+            ('trgm+sim', build_tier2_query('all', q, '', [], args.limit, order_by_similarity=True,
+                                           full_text=True)),
+        ]
+        if not has_trgm:
+            variants = variants[:2]  # similarity() needs pg_trgm
+        for name, (sql, params) in variants:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            scans = ', '.join(scan_nodes(plan[0]['Plan']))
+            median, p95 = time_statement(cursor, sql, params, args.runs)
+            print(f"{raw:<10} {name:<10} {median:>10.2f} {p95:>10.2f}  {scans}")
+        print()
+
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Load test: replay a recorded query mix against an API server
+============================================================
+
+Replays the requests in a mix file (default: benchmarks/query_mix.txt,
+searches in all / exact / starts mode, entry pages and poetry browsing)
+at one or more client concurrencies, and reports throughput and
+p50 / p95 / p99 latency per endpoint. The server must already be
+running; disable its search cache so every search reaches the database:
+
+    SEARCH_CACHE_SIZE=0 gunicorn --bind :5000 --workers 2 --threads 4 server_postgresql:app
+    python benchmarks/load_replay.py --concurrency 1,8,32 --requests 2000 --json run.json
+
+    cd backend && python simple_server.py
+    python benchmarks/load_replay.py --server simple --url http://localhost:8000
+
+backend/simple_server.py only serves search, browse and the dictionary
+metadata routes; with --server simple the other requests in the mix are
+skipped (and listed). server_asgi.py serves the same routes as
+server_postgresql.py.
+
+Endpoints are named after the route: searches by mode (search:all,
+search:exact, search:starts), other paths with ids replaced
+(/api/entry/<id>, /api/poem/<id>, ...).
+
+Comparing runs (e.g. in CI):
+    --json FILE              write the results as JSON
+    --compare BASELINE.json  compare against an earlier --json file; exits 1
+                             when an endpoint's p95 or a run's throughput
+                             is more than --max-regression (0.25) worse;
+                             endpoints with fewer than --min-samples (30)
+                             requests are not compared
+
+A mix file has one request per line, replayed in order and cycled:
+either a path or an access-log line with "GET <path> HTTP/...". Blank
+lines and # comments are ignored. The client is a thread pool with one
+keep-alive connection per thread, so it has no dependencies beyond the
+standard library.
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import os
+import platform
+import random
+import re
+import sys
+import threading
+import time
+import urllib.parse
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+DEFAULT_MIX = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'query_mix.txt')
+
+# Route prefixes backend/simple_server.py answers; everything else is a 404 there
+SIMPLE_SERVER_ROUTES = ('/api/search', '/api/dictionaries', '/api/stats', '/api/chapters', '/api/browse/')
+
+ACCESS_LOG_REQUEST = re.compile(r'"?(?:GET) (\S+) HTTP/[\d.]+')
+
+
+def load_mix(path):
+    """Request paths of a mix file, in order"""
+    paths = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if not line.startswith('/'):
+                match = ACCESS_LOG_REQUEST.search(line)
+                if not match:
+                    continue
+                line = match.group(1)
+            paths.append(line)
+    return paths
+
+
+def endpoint_name(path):
+    """Name a request is reported under: search:<mode>, or the route with ids replaced"""
+    parsed = urllib.parse.urlsplit(path)
+    if parsed.path == '/api/search':
+        mode = urllib.parse.parse_qs(parsed.query).get('mode', ['all'])[0]
+        return f'search:{mode}'
+    if parsed.path.startswith('/api/browse/'):
+        return '/api/browse/<chapter>'
+    return re.sub(r'/\d+(?=/|$)', '/<id>', parsed.path)
+
+
+def served_by(server, path):
+    if server == 'simple':
+        return urllib.parse.urlsplit(path).path.startswith(SIMPLE_SERVER_ROUTES)
+    return True
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def latency_summary(latencies):
+    latencies = sorted(latencies)
+    if not latencies:
+        return None
+    return {
+        'p50': round(percentile(latencies, 0.50), 3),
+        'p95': round(percentile(latencies, 0.95), 3),
+        'p99': round(percentile(latencies, 0.99), 3),
+        'mean': round(sum(latencies) / len(latencies), 3),
+        'max': round(latencies[-1], 3),
+    }
+
+
+def run_load(base_url, paths, concurrency, total_requests=None, duration=None, accept_encoding=None):
+    """
+    Replay paths (cycling) with concurrency threads, until total_requests
+    have been sent or duration seconds have passed. Returns
+    (elapsed_s, samples, errors): samples are (endpoint, latency_ms,
+    bytes, ok) tuples, errors (endpoint, message) pairs.
+    """
+    parsed = urllib.parse.urlsplit(base_url)
+    prefix = parsed.path.rstrip('/')
+    headers = {'Accept-Encoding': accept_encoding} if accept_encoding else {}
+    local = threading.local()
+    counter = iter(range(total_requests)) if total_requests is not None else itertools.count()
+    counter_lock = threading.Lock()
+    deadline = time.perf_counter() + duration if duration else None
+    samples = []
+    errors = []
+
+    def connection():
+        if not hasattr(local, 'conn'):
+            conn_class = http.client.HTTPSConnection if parsed.scheme == 'https' else http.client.HTTPConnection
+            local.conn = conn_class(parsed.hostname, parsed.port, timeout=60)
+        return local.conn
+
+    def worker():
+        while True:
+            with counter_lock:
+                i = next(counter, None)
+            if i is None or (deadline and time.perf_counter() >= deadline):
+                return
+            path = paths[i % len(paths)]
+            endpoint = endpoint_name(path)
+            start = time.perf_counter()
+            try:
+                conn = connection()
+                conn.request('GET', prefix + urllib.parse.quote(path, safe='/?=&%+,:'), headers=headers)
+                response = conn.getresponse()
+                body = response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException) as e:
+                local.__dict__.pop('conn', None)
+                errors.append((endpoint, f'{type(e).__name__}: {e}'))
+                continue
+            samples.append((endpoint, (time.perf_counter() - start) * 1000, len(body), status < 400))
+            if status >= 400:
+                errors.append((endpoint, f'HTTP {status} {path}'))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    elapsed = time.perf_counter() - start
+    return elapsed, samples, errors
+
+
+def summarize(concurrency, elapsed, samples, errors):
+    """JSON-ready results of one run: totals plus one entry per endpoint"""
+    by_endpoint = defaultdict(list)
+    for sample in samples:
+        by_endpoint[sample[0]].append(sample)
+    errors_by_endpoint = defaultdict(list)
+    for endpoint, message in errors:
+        errors_by_endpoint[endpoint].append(message)
+
+    endpoints = {}
+    for endpoint in sorted(set(by_endpoint) | set(errors_by_endpoint)):
+        endpoint_samples = by_endpoint.get(endpoint, [])
+        endpoint_errors = errors_by_endpoint.get(endpoint, [])
+        endpoints[endpoint] = {
+            'requests': len(endpoint_samples),
+            'errors': len(endpoint_errors),
+            'throughput_rps': round(len(endpoint_samples) / elapsed, 2),
+            'mean_bytes': round(sum(s[2] for s in endpoint_samples) / len(endpoint_samples)) if endpoint_samples else 0,
+            'latency_ms': latency_summary([s[1] for s in endpoint_samples if s[3]]),
+            'error_samples': sorted(set(endpoint_errors))[:3],
+        }
+
+    return {
+        'concurrency': concurrency,
+        'elapsed_s': round(elapsed, 3),
+        'requests': len(samples),
+        'errors': len(errors),
+        'throughput_rps': round(len(samples) / elapsed, 2),
+        'latency_ms': latency_summary([s[1] for s in samples if s[3]]),
+        'endpoints': endpoints,
+    }
+
+
+def print_run(run):
+    print()
+    print(f"Concurrency {run['concurrency']}: {run['requests']} requests in {run['elapsed_s']:.1f} s, "
+          f"{run['throughput_rps']:.1f} req/s, {run['errors']} errors")
+    print(f"{'endpoint':<24} {'requests':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'bytes':>8} {'errors':>7}")
+    print("-" * 80)
+    rows = list(run['endpoints'].items()) + [('total', run)]
+    for endpoint, stats in rows:
+        latency = stats['latency_ms'] or {'p50': 0, 'p95': 0, 'p99': 0}
+        print(f"{endpoint:<24} {stats['requests']:>8} {stats['throughput_rps']:>8.1f} {latency['p50']:>8.1f} "
+              f"{latency['p95']:>8.1f} {latency['p99']:>8.1f} {stats.get('mean_bytes', ''):>8} "
+              f"{stats['errors']:>7}")
+    for endpoint, stats in run['endpoints'].items():
+        for error in stats['error_samples']:
+            print(f"  {endpoint}: {error}")
+
+
+def compare(results, baseline, max_regression, min_samples):
+    """
+    Print how results differ from baseline (both --json documents) and
+    return the regressions: an endpoint's p95 or a run's throughput more
+    than max_regression worse. Runs are matched by concurrency; endpoints
+    with fewer than min_samples requests in either run are too noisy to
+    compare and are left out.
+    """
+    baseline_runs = {run['concurrency']: run for run in baseline['runs']}
+    regressions = []
+
+    print()
+    print("=" * 80)
+    print(f"Compared with baseline ({baseline.get('started_at', '?')}, max regression {max_regression:.0%})")
+    print("=" * 80)
+    print(f"{'conc':>4} {'endpoint':<24} {'baseline':>10} {'current':>10} {'change':>8}")
+    print("-" * 80)
+    for run in results['runs']:
+        old_run = baseline_runs.get(run['concurrency'])
+        if old_run is None:
+            print(f"{run['concurrency']:>4} (no baseline run at this concurrency)")
+            continue
+
+        checks = [('total req/s', old_run['throughput_rps'], run['throughput_rps'], True)]
+        for endpoint, stats in run['endpoints'].items():
+            old_stats = old_run['endpoints'].get(endpoint)
+            if (old_stats and old_stats['latency_ms'] and stats['latency_ms']
+                    and min(old_stats['requests'], stats['requests']) >= min_samples):
+                checks.append((f'{endpoint} p95', old_stats['latency_ms']['p95'], stats['latency_ms']['p95'], False))
+
+        for name, old, new, higher_is_better in checks:
+            if not old:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            flag = '  REGRESSION' if worse > max_regression else ''
+            print(f"{run['concurrency']:>4} {name:<24} {old:>10.1f} {new:>10.1f} {change:>+8.0%}{flag}")
+            if flag:
+                regressions.append(f"concurrency {run['concurrency']}: {name} {old:.1f} -> {new:.1f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a recorded query mix against an API server')
+    parser.add_argument('--url', default='http://localhost:5000', help='server base URL (default: http://localhost:5000)')
+    parser.add_argument('--server', choices=['postgresql', 'simple'], default='postgresql',
+                        help='which server is at --url: server_postgresql.py / server_asgi.py, '
+                             'or backend/simple_server.py (default: postgresql)')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='mix file (default: benchmarks/query_mix.txt)')
+    parser.add_argument('--concurrency', default='8',
+                        help='comma-separated client concurrencies, one run each (default: 8)')
+    parser.add_argument('--requests', type=int, default=1000, help='requests per run (default: 1000)')
+    parser.add_argument('--duration', type=float, help='seconds per run, instead of --requests')
+    parser.add_argument('--warmup', type=int, default=100, help='untimed requests before the runs (default: 100)')
+    parser.add_argument('--shuffle', action='store_true', help='replay the mix in random order (see --seed)')
+    parser.add_argument('--seed', type=int, default=0, help='seed for --shuffle (default: 0)')
+    parser.add_argument('--accept-encoding', default='gzip, br',
+                        help="Accept-Encoding header sent, '' for none (default: 'gzip, br')")
+    parser.add_argument('--json', metavar='FILE', help='write the results as JSON to FILE')
+    parser.add_argument('--compare', metavar='BASELINE', help='compare with an earlier --json file')
+    parser.add_argument('--max-regression', type=float, default=0.25,
+                        help='allowed p95 / throughput regression for --compare (default: 0.25)')
+    parser.add_argument('--min-samples', type=int, default=30,
+                        help='endpoints with fewer requests are not compared (default: 30)')
+    args = parser.parse_args()
+
+    concurrencies = [int(c) for c in args.concurrency.split(',') if c.strip()]
+    mix = load_mix(args.mix)
+    paths = [p for p in mix if served_by(args.server, p)]
+    skipped = sorted({endpoint_name(p) for p in mix if not served_by(args.server, p)})
+    if not paths:
+        sys.exit(f"No requests in {args.mix} that the {args.server} server serves")
+    if args.shuffle:
+        random.Random(args.seed).shuffle(paths)
+
+    print("=" * 80)
+    print(f"Load replay: {args.url} ({args.server})")
+    print("=" * 80)
+    print(f"Mix: {args.mix} ({len(paths)} requests, {len({endpoint_name(p) for p in paths})} endpoints)")
+    if skipped:
+        print(f"Skipped (not served by the {args.server} server): {', '.join(skipped)}")
+    run_size = f"{args.duration:g} s" if args.duration else f"{args.requests} requests"
+    print(f"Concurrency: {', '.join(map(str, concurrencies))}   per run: {run_size}   warmup: {args.warmup}")
+
+    if args.warmup:
+        run_load(args.url, paths, min(max(concurrencies), args.warmup), total_requests=args.warmup,
+                 accept_encoding=args.accept_encoding)
+
+    results = {
+        'url': args.url,
+        'server': args.server,
+        'mix': os.path.basename(args.mix),
+        'mix_requests': len(paths),
+        'skipped_endpoints': skipped,
+        'shuffle_seed': args.seed if args.shuffle else None,
+        'accept_encoding': args.accept_encoding,
+        'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'client': {'python': platform.python_version(), 'host': platform.node()},
+        'runs': [],
+    }
+    for concurrency in concurrencies:
+        elapsed, samples, errors = run_load(
+            args.url, paths, concurrency,
+            total_requests=None if args.duration else args.requests,
+            duration=args.duration, accept_encoding=args.accept_encoding)
+        if not samples:
+            sys.exit(f"No successful requests at concurrency {concurrency} "
+                     f"({errors[0][1] if errors else 'unknown error'})")
+        run = summarize(concurrency, elapsed, samples, errors)
+        results['runs'].append(run)
+        print_run(run)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n✅ Results written to {args.json}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.max_regression, args.min_samples)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) over {args.max_regression:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\n✅ No regressions")
+
+
+if __name__ == '__main__':
+    main()
@@ -447,6 +447,62 @@ class DatabaseManager:
             (key, value, datetime.now().isoformat())
         )
     
+    def refresh_dictionary_stats(self):
+        """
+        Rebuild the dictionary_stats table (one row per dictionary, plus
+        dictionary_id = 0 for all dictionaries) so the API can serve
+        /api/stats without counting rows on every request.
+        """
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS dictionary_stats (
+                dictionary_id INTEGER PRIMARY KEY,
+                entry_count INTEGER NOT NULL DEFAULT 0,
+                sub_entry_count INTEGER NOT NULL DEFAULT 0,
+                definition_count INTEGER NOT NULL DEFAULT 0,
+                chapter_count INTEGER NOT NULL DEFAULT 0,
+                min_page INTEGER,
+                max_page INTEGER,
+                refreshed_at TEXT
+            )
+        """)
+        self.cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sub_entries'")
+        has_sub_entries = self.cursor.fetchone() is not None
+        sub_entries_sql = ("(SELECT COUNT(*) FROM sub_entries s WHERE s.dictionary_id = d.dictionary_id)"
+                           if has_sub_entries else "0")
+        sub_entries_total_sql = "(SELECT COUNT(*) FROM sub_entries)" if has_sub_entries else "0"
+        refreshed_at = datetime.now().isoformat()
+        
+        self.cursor.execute("DELETE FROM dictionary_stats")
+        self.cursor.execute(f"""
+            INSERT INTO dictionary_stats
+                (dictionary_id, entry_count, sub_entry_count, definition_count, chapter_count,
+                 min_page, max_page, refreshed_at)
+            SELECT d.dictionary_id,
+                   (SELECT COUNT(*) FROM entries e WHERE e.dictionary_id = d.dictionary_id),
+                   {sub_entries_sql},
+                   (SELECT COUNT(*) FROM definitions df JOIN entries e ON df.entry_id = e.entry_id
+                    WHERE e.dictionary_id = d.dictionary_id),
+                   (SELECT COUNT(DISTINCT name_arabic) FROM chapters c WHERE c.dictionary_id = d.dictionary_id),
+                   (SELECT MIN(page_number) FROM entries e WHERE e.dictionary_id = d.dictionary_id),
+                   (SELECT MAX(page_number) FROM entries e WHERE e.dictionary_id = d.dictionary_id),
+                   ?
+            FROM dictionaries d
+        """, (refreshed_at,))
+        self.cursor.execute(f"""
+            INSERT INTO dictionary_stats
+                (dictionary_id, entry_count, sub_entry_count, definition_count, chapter_count,
+                 min_page, max_page, refreshed_at)
+            SELECT 0,
+                   (SELECT COUNT(*) FROM entries),
+                   {sub_entries_total_sql},
+                   (SELECT COUNT(*) FROM definitions),
+                   (SELECT COUNT(DISTINCT name_arabic) FROM chapters),
+                   (SELECT MIN(page_number) FROM entries),
+                   (SELECT MAX(page_number) FROM entries),
+                   ?
+        """, (refreshed_at,))
+        logger.info("Dictionary statistics refreshed")
+    
     def commit(self):
         """Commit transaction"""
         self.conn.commit()
@@ -688,6 +744,8 @@ class DictionaryExtractor:
         self.db.set_metadata(f'total_chapters_dict_{self.dictionary_id}', str(self.stats['total_chapters']))
         self.db.set_metadata(f'total_sections_dict_{self.dictionary_id}', str(self.stats['total_sections']))
         self.db.set_metadata(f'total_entries_dict_{self.dictionary_id}', str(self.stats['total_entries']))
+        # Bumped on every import so API caches know the data changed
+        self.db.set_metadata('data_version', datetime.now().isoformat())
     
     def print_statistics(self):
         """Print extraction statistics"""
@@ -721,9 +779,10 @@ class DictionaryExtractor:
             for html_file in html_files:
                 self.process_html_file(html_file)
             
-            # Step 3: Save metadata
+            # Step 3: Save metadata and precomputed statistics
             logger.info("Step 3: Saving metadata...")
             self.save_metadata(html_files)
+            self.db.refresh_dictionary_stats()
             
             # Step 4: Commit and close
             logger.info("Step 4: Finalizing...")
@@ -753,6 +812,17 @@ def main():
     DB_FILE = r"c:\python apps\arabic_qamoos\qamoos_database.sqlite"
     DICTIONARY_ID = 2  # المعجم الوسيط
     
+    # Explicit stats refresh without re-extracting:
+    #   python extract_dictionary_v2.py --refresh-stats [path/to/qamoos_database.sqlite]
+    if len(sys.argv) > 1 and sys.argv[1] == '--refresh-stats':
+        db = DatabaseManager(sys.argv[2] if len(sys.argv) > 2 else DB_FILE)
+        db.connect()
+        db.refresh_dictionary_stats()
+        db.commit()
+        db.close()
+        print("Dictionary statistics refreshed")
+        return
+    
     # Verify HTML files exist
     for html_file in HTML_FILES:
         if not os.path.exists(html_file):
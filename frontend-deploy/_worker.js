@@ -3,6 +3,11 @@
  * Proxies /api/* requests to Google Cloud Run backend
  */
 
+// Read-only endpoints the backend serves through @conditional_get: they send
+// Cache-Control with s-maxage and an ETag tied to the data version, so the
+// edge may cache them. Every other /api/* route is passed through uncached.
+const EDGE_CACHED_API = /^\/api\/(dictionaries|stats|chapters|entry\/\d+|poem\/\d+)$/;
+
 export default {
   async fetch(request, env) {
     const url = new URL(request.url);
@@ -38,14 +43,21 @@ export default {
         body: request.body,
       });
       
-      const response = await fetch(backendRequest);
+      // Let the edge cache the @conditional_get routes; it honours their
+      // Cache-Control (s-maxage) and revalidates with ETag / Last-Modified
+      const edgeCached = request.method === 'GET' && EDGE_CACHED_API.test(url.pathname);
+      const response = await fetch(backendRequest, edgeCached ? {
+        cf: { cacheEverything: true },
+      } : undefined);
       
       // Clone response and add CORS headers
       const newResponse = new Response(response.body, response);
       newResponse.headers.set('Access-Control-Allow-Origin', 'https://qamoos.org');
       newResponse.headers.set('Access-Control-Allow-Methods', 'GET, POST, OPTIONS');
       newResponse.headers.set('Access-Control-Allow-Headers', 'Content-Type');
-      newResponse.headers.set('Cache-Control', 'public, max-age=300'); // Cache for 5 minutes
+      if (!edgeCached || !response.headers.has('Cache-Control')) {
+        newResponse.headers.set('Cache-Control', 'public, max-age=300'); // Cache for 5 minutes
+      }
       
       return newResponse;
     }
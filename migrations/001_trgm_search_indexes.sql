@@ -0,0 +1,26 @@
+-- ============================================================================
+-- 001: Trigram (pg_trgm) GIN indexes for substring search
+-- ============================================================================
+--
+-- The /api/search 'all' / 'contains' path filters with LIKE '%q%' on
+-- headword_normalized, root and full_text. Leading-wildcard patterns cannot
+-- use a B-tree index, so without these every search scans all entries.
+-- pg_trgm GIN indexes let the planner answer them with a BitmapOr of
+-- bitmap index scans.
+--
+-- Apply (outside a transaction, CONCURRENTLY keeps the table writable):
+--     psql "$DATABASE_URL" -f migrations/001_trgm_search_indexes.sql
+-- ============================================================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_entries_headword_normalized_trgm
+    ON entries USING gin (headword_normalized gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_entries_root_trgm
+    ON entries USING gin (root gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_entries_full_text_trgm
+    ON entries USING gin (full_text gin_trgm_ops);
+
+ANALYZE entries;
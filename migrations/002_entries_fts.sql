@@ -0,0 +1,134 @@
+-- ============================================================================
+-- 002: Arabic full-text search column for /api/search?mode=fts
+-- ============================================================================
+--
+-- Adds entries.search_tsv, a stored tsvector over the headword, the entry's
+-- full_text and all of its definitions, normalized the same way as
+-- extract_dictionary_v2.py (ArabicTextNormalizer):
+--     * diacritics (U+064B-U+0658, U+0670) stripped
+--     * tatweel (U+0640) removed
+--     * hamza forms (أ إ آ) folded to ا, ة to ه, ى to ي
+--
+-- The 'simple' text search configuration is used on purpose: it lowercases
+-- and splits on word boundaries but does not stem, so a query matches whole
+-- words of the normalized text. Headwords get weight A so ts_rank puts
+-- headword hits ahead of matches buried in long articles.
+--
+-- The column cannot be a GENERATED column because it reads the definitions
+-- table, so triggers maintain it instead:
+--     * entries: recomputed for the row whenever headword or full_text is
+--       inserted or changed
+--     * definitions: recomputed, once per statement, for every entry whose
+--       definitions were inserted, updated or deleted
+-- qamoos_refresh_search_tsv() rebuilds every row; it runs once below and
+-- is only needed again if the triggers were disabled for a bulk load:
+--     psql "$DATABASE_URL" -c "SELECT qamoos_refresh_search_tsv();"
+--
+-- Apply:
+--     psql "$DATABASE_URL" -f migrations/002_entries_fts.sql
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION qamoos_normalize(text) RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT translate(
+        $1,
+        -- folded letters, then characters to delete
+        'أإآةى' || U&'\064B\064C\064D\064E\064F\0650\0651\0652\0653\0654\0655\0656\0657\0658\0670\0640',
+        'اااهي'
+    )
+$$;
+
+CREATE OR REPLACE FUNCTION qamoos_entry_tsv(headword text, full_text text, definitions text)
+RETURNS tsvector
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT setweight(to_tsvector('simple', qamoos_normalize(coalesce(headword, ''))), 'A')
+        || setweight(to_tsvector('simple', qamoos_normalize(coalesce(full_text, ''))), 'B')
+        || setweight(to_tsvector('simple', qamoos_normalize(coalesce(definitions, ''))), 'C')
+$$;
+
+ALTER TABLE entries ADD COLUMN IF NOT EXISTS search_tsv tsvector;
+
+CREATE OR REPLACE FUNCTION qamoos_refresh_search_tsv() RETURNS bigint
+LANGUAGE sql AS $$
+    WITH updated AS (
+        UPDATE entries e
+        SET search_tsv = qamoos_entry_tsv(e.headword, e.full_text, defs.definitions)
+        FROM (
+            SELECT e2.entry_id, string_agg(d.definition_text, ' ' ORDER BY d.definition_order) AS definitions
+            FROM entries e2
+            LEFT JOIN definitions d ON d.entry_id = e2.entry_id
+            GROUP BY e2.entry_id
+        ) defs
+        WHERE defs.entry_id = e.entry_id
+        RETURNING 1
+    )
+    SELECT COUNT(*) FROM updated
+$$;
+
+CREATE OR REPLACE FUNCTION qamoos_entry_definitions(entry integer) RETURNS text
+LANGUAGE sql STABLE AS $$
+    SELECT string_agg(definition_text, ' ' ORDER BY definition_order)
+    FROM definitions
+    WHERE entry_id = entry
+$$;
+
+CREATE OR REPLACE FUNCTION qamoos_entries_search_tsv_trigger() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.search_tsv := qamoos_entry_tsv(NEW.headword, NEW.full_text, qamoos_entry_definitions(NEW.entry_id));
+    RETURN NEW;
+END
+$$;
+
+-- Statement-level with transition tables, so a bulk load of definitions
+-- recomputes each entry once. Transition tables allow one event per
+-- trigger, hence three triggers on the one function.
+CREATE OR REPLACE FUNCTION qamoos_definitions_search_tsv_trigger() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE entries e
+        SET search_tsv = qamoos_entry_tsv(e.headword, e.full_text, qamoos_entry_definitions(e.entry_id))
+        WHERE e.entry_id IN (SELECT entry_id FROM new_definitions);
+    ELSIF TG_OP = 'UPDATE' THEN
+        UPDATE entries e
+        SET search_tsv = qamoos_entry_tsv(e.headword, e.full_text, qamoos_entry_definitions(e.entry_id))
+        WHERE e.entry_id IN (SELECT entry_id FROM old_definitions UNION SELECT entry_id FROM new_definitions);
+    ELSE
+        UPDATE entries e
+        SET search_tsv = qamoos_entry_tsv(e.headword, e.full_text, qamoos_entry_definitions(e.entry_id))
+        WHERE e.entry_id IN (SELECT entry_id FROM old_definitions);
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS qamoos_entries_search_tsv ON entries;
+CREATE TRIGGER qamoos_entries_search_tsv
+    BEFORE INSERT OR UPDATE OF headword, full_text ON entries
+    FOR EACH ROW EXECUTE FUNCTION qamoos_entries_search_tsv_trigger();
+
+DROP TRIGGER IF EXISTS qamoos_definitions_insert_search_tsv ON definitions;
+CREATE TRIGGER qamoos_definitions_insert_search_tsv
+    AFTER INSERT ON definitions
+    REFERENCING NEW TABLE AS new_definitions
+    FOR EACH STATEMENT EXECUTE FUNCTION qamoos_definitions_search_tsv_trigger();
+
+DROP TRIGGER IF EXISTS qamoos_definitions_update_search_tsv ON definitions;
+CREATE TRIGGER qamoos_definitions_update_search_tsv
+    AFTER UPDATE ON definitions
+    REFERENCING OLD TABLE AS old_definitions NEW TABLE AS new_definitions
+    FOR EACH STATEMENT EXECUTE FUNCTION qamoos_definitions_search_tsv_trigger();
+
+DROP TRIGGER IF EXISTS qamoos_definitions_delete_search_tsv ON definitions;
+CREATE TRIGGER qamoos_definitions_delete_search_tsv
+    AFTER DELETE ON definitions
+    REFERENCING OLD TABLE AS old_definitions
+    FOR EACH STATEMENT EXECUTE FUNCTION qamoos_definitions_search_tsv_trigger();
+
+SELECT qamoos_refresh_search_tsv();
+
+CREATE INDEX IF NOT EXISTS idx_entries_search_tsv
+    ON entries USING gin (search_tsv);
+
+ANALYZE entries;
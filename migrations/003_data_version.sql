@@ -0,0 +1,29 @@
+-- ============================================================================
+-- 003: metadata['data_version'] for cache invalidation
+-- ============================================================================
+--
+-- server_postgresql.py re-reads metadata['data_version'] every
+-- DATA_VERSION_CHECK_INTERVAL seconds and drops its cached search results
+-- whenever the value changes. Any import that modifies dictionary or poetry
+-- data must finish with:
+--     psql "$DATABASE_URL" -c "SELECT qamoos_bump_data_version();"
+--
+-- Apply:
+--     psql "$DATABASE_URL" -f migrations/003_data_version.sql
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION qamoos_bump_data_version() RETURNS text
+LANGUAGE plpgsql AS $$
+DECLARE
+    new_version text := to_char(clock_timestamp() AT TIME ZONE 'UTC', 'YYYYMMDD"T"HH24MISS.US');
+BEGIN
+    UPDATE metadata SET value = new_version, updated_at = now() WHERE key = 'data_version';
+    IF NOT FOUND THEN
+        INSERT INTO metadata (key, value, updated_at) VALUES ('data_version', new_version, now());
+    END IF;
+    RETURN new_version;
+END
+$$;
+
+SELECT qamoos_bump_data_version()
+WHERE NOT EXISTS (SELECT 1 FROM metadata WHERE key = 'data_version');
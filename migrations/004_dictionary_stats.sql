@@ -0,0 +1,76 @@
+-- ============================================================================
+-- 004: Precomputed dictionary statistics for /api/stats
+-- ============================================================================
+--
+-- /api/stats used to COUNT(*) entries and sub_entries on every request.
+-- dictionary_stats holds one row per dictionary plus dictionary_id = 0 for
+-- all dictionaries combined, so the endpoint is a primary-key lookup.
+--
+-- The table is filled by qamoos_refresh_stats(). Run it at the end of every
+-- import (before qamoos_bump_data_version()), or whenever counts look stale:
+--     psql "$DATABASE_URL" -c "SELECT qamoos_refresh_stats();"
+--
+-- Apply:
+--     psql "$DATABASE_URL" -f migrations/004_dictionary_stats.sql
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS dictionary_stats (
+    dictionary_id INTEGER PRIMARY KEY,          -- 0 = all dictionaries
+    entry_count BIGINT NOT NULL DEFAULT 0,
+    sub_entry_count BIGINT NOT NULL DEFAULT 0,
+    definition_count BIGINT NOT NULL DEFAULT 0,
+    chapter_count BIGINT NOT NULL DEFAULT 0,    -- distinct chapter names
+    min_page INTEGER,
+    max_page INTEGER,
+    refreshed_at TIMESTAMP NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION qamoos_refresh_stats() RETURNS integer
+LANGUAGE plpgsql AS $$
+DECLARE
+    row_count integer;
+BEGIN
+    DELETE FROM dictionary_stats;
+
+    WITH entry_stats AS (
+        SELECT dictionary_id, COUNT(*) AS n, MIN(page_number) AS min_page, MAX(page_number) AS max_page
+        FROM entries GROUP BY dictionary_id
+    ),
+    sub_entry_stats AS (
+        SELECT dictionary_id, COUNT(*) AS n FROM sub_entries GROUP BY dictionary_id
+    ),
+    definition_stats AS (
+        SELECT e.dictionary_id, COUNT(*) AS n
+        FROM definitions d JOIN entries e ON d.entry_id = e.entry_id
+        GROUP BY e.dictionary_id
+    ),
+    chapter_stats AS (
+        SELECT dictionary_id, COUNT(DISTINCT name_arabic) AS n FROM chapters GROUP BY dictionary_id
+    )
+    INSERT INTO dictionary_stats
+        (dictionary_id, entry_count, sub_entry_count, definition_count, chapter_count, min_page, max_page)
+    SELECT d.dictionary_id,
+           COALESCE(es.n, 0), COALESCE(ss.n, 0), COALESCE(ds.n, 0), COALESCE(cs.n, 0),
+           es.min_page, es.max_page
+    FROM dictionaries d
+    LEFT JOIN entry_stats es ON es.dictionary_id = d.dictionary_id
+    LEFT JOIN sub_entry_stats ss ON ss.dictionary_id = d.dictionary_id
+    LEFT JOIN definition_stats ds ON ds.dictionary_id = d.dictionary_id
+    LEFT JOIN chapter_stats cs ON cs.dictionary_id = d.dictionary_id;
+
+    INSERT INTO dictionary_stats
+        (dictionary_id, entry_count, sub_entry_count, definition_count, chapter_count, min_page, max_page)
+    SELECT 0,
+           (SELECT COUNT(*) FROM entries),
+           (SELECT COUNT(*) FROM sub_entries),
+           (SELECT COUNT(*) FROM definitions),
+           (SELECT COUNT(DISTINCT name_arabic) FROM chapters),
+           (SELECT MIN(page_number) FROM entries),
+           (SELECT MAX(page_number) FROM entries);
+
+    SELECT COUNT(*) INTO row_count FROM dictionary_stats;
+    RETURN row_count;
+END
+$$;
+
+SELECT qamoos_refresh_stats();
@@ -0,0 +1,22 @@
+-- ============================================================================
+-- 005: Composite indexes for keyset pagination of /api/poems and /api/poets
+-- ============================================================================
+--
+-- With after=<cursor>, /api/poems filters `poem_id < last_id` (optionally
+-- within one poet) and /api/poets filters on the row value
+-- (-COALESCE(poems_count, -1), poet_id). These indexes match those sort
+-- keys so every page is an index range scan of `limit` rows, however deep.
+-- Unfiltered /api/poems pages are already served by the poems primary key.
+--
+-- Apply:
+--     psql "$DATABASE_URL" -f migrations/005_keyset_pagination.sql
+-- ============================================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_poems_poet_id_poem_id
+    ON poems (poet_id, poem_id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_poets_popularity
+    ON poets ((-COALESCE(poems_count, -1)), poet_id);
+
+ANALYZE poems;
+ANALYZE poets;
@@ -0,0 +1,36 @@
+-- ============================================================================
+-- 006: Normalized, trigram-indexed verse and title search for
+--      /api/poetry/search
+-- ============================================================================
+--
+-- Adds verses.full_verse_normalized and poems.title_normalized, both
+-- qamoos_normalize() of the source text (diacritics and tatweel stripped,
+-- hamza forms / taa marbuta / alif maqsura folded; see 002). An unvocalized
+-- query therefore matches a fully vocalized verse.
+--
+-- They are STORED generated columns: qamoos_normalize() is IMMUTABLE and
+-- only reads the row itself, so re-imports keep them current with no
+-- refresh step. The pg_trgm GIN indexes (extension created by 001) serve
+-- the endpoint's LIKE '%q%' filters without scanning every verse.
+--
+-- Requires 001 (pg_trgm) and 002 (qamoos_normalize). Adding the columns
+-- rewrites both tables once.
+--
+-- Apply:
+--     psql "$DATABASE_URL" -f migrations/006_verse_search.sql
+-- ============================================================================
+
+ALTER TABLE verses ADD COLUMN IF NOT EXISTS full_verse_normalized text
+    GENERATED ALWAYS AS (qamoos_normalize(full_verse)) STORED;
+
+ALTER TABLE poems ADD COLUMN IF NOT EXISTS title_normalized text
+    GENERATED ALWAYS AS (qamoos_normalize(title_arabic)) STORED;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_verses_full_verse_normalized_trgm
+    ON verses USING gin (full_verse_normalized gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_poems_title_normalized_trgm
+    ON poems USING gin (title_normalized gin_trgm_ops);
+
+ANALYZE verses;
+ANALYZE poems;
@@ -0,0 +1,66 @@
+-- ============================================================================
+-- 007: Precomputed verse-word -> dictionary entry links for
+--      /api/poem/<id>?annotate=1
+-- ============================================================================
+--
+-- token_entries maps every distinct word that occurs in a verse, reduced
+-- by qamoos_token(), to the entries whose headword_normalized matches it
+-- exactly, with or without a leading ال on either side (the same rule as
+-- /api/lookup/batch). Up to 10 entry ids are kept per word, shortest
+-- headword first.
+--
+-- qamoos_token() is qamoos_normalize() (002) with everything that is not
+-- an Arabic letter removed, so punctuation and verse markers around a word
+-- do not stop it from matching. The endpoint tokenizes verses with the
+-- same function, so it only needs a primary-key join per request.
+--
+-- The table is filled by qamoos_refresh_token_entries(). Run it at the end
+-- of every import (before qamoos_bump_data_version()):
+--     psql "$DATABASE_URL" -c "SELECT qamoos_refresh_token_entries();"
+--
+-- Requires 002 (qamoos_normalize).
+--
+-- Apply:
+--     psql "$DATABASE_URL" -f migrations/007_verse_token_entries.sql
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION qamoos_token(text) RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT regexp_replace(qamoos_normalize($1), '[^ء-ي]', '', 'g')
+$$;
+
+CREATE TABLE IF NOT EXISTS token_entries (
+    token TEXT PRIMARY KEY,
+    entry_ids INTEGER[] NOT NULL
+);
+
+CREATE OR REPLACE FUNCTION qamoos_refresh_token_entries() RETURNS bigint
+LANGUAGE plpgsql AS $$
+DECLARE
+    linked bigint;
+BEGIN
+    DELETE FROM token_entries;
+
+    INSERT INTO token_entries (token, entry_ids)
+    SELECT w.token,
+           (array_agg(e.entry_id ORDER BY LENGTH(e.headword), e.entry_id))[1:10]
+    FROM (
+        SELECT DISTINCT qamoos_token(word) AS token
+        FROM verses v
+        CROSS JOIN LATERAL regexp_split_to_table(v.full_verse, '\s+') AS word
+    ) w
+    JOIN entries e ON e.headword_normalized = ANY(ARRAY[
+        w.token,
+        'ال' || w.token,
+        CASE WHEN w.token LIKE 'ال%' AND length(w.token) > 3 THEN substr(w.token, 3) END
+    ])
+    WHERE w.token <> ''
+    GROUP BY w.token;
+
+    GET DIAGNOSTICS linked = ROW_COUNT;
+    ANALYZE token_entries;
+    RETURN linked;
+END
+$$;
+
+SELECT qamoos_refresh_token_entries();
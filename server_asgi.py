@@ -0,0 +1,902 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Arabic Dictionary - Async PostgreSQL Server
+===========================================
+
+ASGI (Starlette + asyncpg) variant of server_postgresql.py for
+high-concurrency deployments. A worker is never blocked on a database
+round trip: one process can keep up to ASYNC_DB_POOL_MAX queries in
+flight, and independent queries of a single request (an entry and its
+definitions, a poem and its verses) run concurrently on separate pooled
+connections.
+
+The SQL builders, result merging and JSON encoding are imported from
+server_postgresql.py, so both servers return identical JSON bodies for
+the routes served here:
+
+    /health, /metrics, /api/cache/stats, /api/dictionaries, /api/stats,
+    /api/search, /api/suggest, /api/lookup/batch (POST), /api/entry/{id},
+    /api/chapters, /api/poets, /api/poet/{id}, /api/poems, /api/poem/{id},
+    /api/poetry/search, /api/export/dictionary/{id}, /api/export/poet/{id}
+
+Not carried over from server_postgresql.py: ETag / If-None-Match (304)
+and Cache-Control on read-only endpoints (conditional_get), the shared
+cross-worker cache tier (SHARED_CACHE_URL), and the pages and static
+assets (/, /search, /poetry.html, frontend-deploy/). Serve those from the
+Flask server or the CDN.
+
+Run:
+    uvicorn server_asgi:app --host 0.0.0.0 --port 8000 --workers 2
+
+Environment variables (plus those documented in server_postgresql.py):
+    ASYNC_DB_POOL_MIN / ASYNC_DB_POOL_MAX - asyncpg connections per worker (default: 2 / 16)
+    DB_POOL_TIMEOUT - Seconds to wait for a free connection before returning 503 (default: 5)
+    DB_POOL_MAX_LIFETIME - Seconds an idle connection is kept before it is closed (default: 1800)
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import re
+import time
+
+import asyncpg
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.datastructures import Headers, MutableHeaders, QueryParams
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+
+from server_postgresql import (
+    ALLOWED_ORIGINS, COMPRESS_MIN_BYTES, COMPRESS_RESPONSES, DATABASE_URL, DATA_VERSION_CHECK_INTERVAL,
+    DB_POOL_MAX_LIFETIME, DB_POOL_TIMEOUT, DEFINITIONS_BATCH_SQL, ENTRY_DEFINITIONS_SQL, ENTRY_SQL, EXPORTS,
+    EXPORT_FORMATS, FLASK_ENV, HEADWORD_INDEX_SQL, POEM_TOKENS_SQL, POETS_SORT_KEY, SEARCH_CACHE_SIZE,
+    SEARCH_CACHE_TTL, SEARCH_DEFAULT_FIELDS, SEARCH_DEFINITIONS_PER_ENTRY, SEARCH_STREAM_BATCH,
+    SEARCH_STREAM_MAX_ROWS, SUGGEST_MAX_LIMIT, ExportEncoder, HeadwordIndex, SearchCache, StreamCompressor,
+    annotate_verses, assemble_batch_lookup, build_batch_lookup_queries, build_dictionary_filter,
+    build_export_query, build_poetry_search_query, build_search_query, build_tier1_query, build_tier2_query,
+    clean_display_root, compact_json, compress_body, decode_cursor, encode_cursor, fold_arabic, ndjson_line,
+    negotiate_encoding, normalize_arabic, numbered_placeholders, parse_batch_lookup, parse_search_fields,
+    project_fields, search_payload, should_compress, wants_definitions, wants_full_text,
+)
+from server_metrics import METRICS_ENABLED, Metrics, RequestTimer, search_mode_label, timed
+
+PORT = int(os.getenv('PORT', 8000))
+ASYNC_DB_POOL_MIN = int(os.getenv('ASYNC_DB_POOL_MIN', 2))
+ASYNC_DB_POOL_MAX = int(os.getenv('ASYNC_DB_POOL_MAX', 16))
+
+pool = None
+search_cache = SearchCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL)
+
+_data_version = None
+_data_version_checked_at = None
+_data_version_lock = asyncio.Lock()
+
+_headword_index = None
+_headword_index_lock = asyncio.Lock()
+
+metrics = Metrics()
+_request_timer = contextvars.ContextVar('request_timer', default=None)
+
+
+class CompressionMiddleware:
+    """
+    ASGI counterpart of server_postgresql.compress_response(): the same
+    Accept-Encoding negotiation, content types and size threshold. A body
+    sent in one message is compressed whole; a streamed body (NDJSON
+    search, plain exports) is compressed message by message.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not COMPRESS_RESPONSES:
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get('accept-encoding'))
+        start = None
+        compressor = None  # StreamCompressor once streaming; False to pass the rest through
+
+        async def send_compressed(message):
+            nonlocal start, compressor
+            if message['type'] == 'http.response.start':
+                headers = MutableHeaders(raw=list(message['headers']))
+                content_type = headers.get('content-type', '').split(';')[0].strip()
+                if not should_compress(message['status'], content_type, headers):
+                    compressor = False
+                    await send(message)
+                    return
+                headers.add_vary_header('Accept-Encoding')
+                message['headers'] = headers.raw
+                if encoding is None:
+                    compressor = False
+                    await send(message)
+                else:
+                    start = message  # held back until the first body message
+                return
+
+            if message['type'] != 'http.response.body' or compressor is False:
+                await send(message)
+                return
+
+            body = message.get('body', b'')
+            more_body = message.get('more_body', False)
+            if compressor is None:
+                headers = MutableHeaders(raw=start['headers'])
+                if not more_body and len(body) < COMPRESS_MIN_BYTES:
+                    compressor = False
+                    await send(start)
+                    await send(message)
+                    return
+                headers['Content-Encoding'] = encoding
+                etag = headers.get('etag')
+                if etag and not etag.startswith('W/'):
+                    headers['ETag'] = 'W/' + etag
+                if not more_body:
+                    with timed(_request_timer.get(), 'compress'):
+                        body = compress_body(body, encoding)
+                    headers['Content-Length'] = str(len(body))
+                    compressor = False
+                    await send(start)
+                    await send({'type': 'http.response.body', 'body': body})
+                    return
+                if 'content-length' in headers:
+                    del headers['content-length']
+                compressor = StreamCompressor(encoding)
+                await send(start)
+
+            with timed(_request_timer.get(), 'compress'):
+                data = compressor.compress(body)
+                if not more_body:
+                    data += compressor.finish()
+            await send({'type': 'http.response.body', 'body': data, 'more_body': more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+class MetricsMiddleware:
+    """
+    ASGI counterpart of server_postgresql's request timing: a RequestTimer
+    per request (fetch(), JSONResponse and CompressionMiddleware add their
+    phases to it), sent as Server-Timing, and the request added to
+    /metrics after its last body message. Outermost, so compression is
+    included.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        timer = RequestTimer()
+        token = _request_timer.set(timer)
+        status = 500
+        observed = False
+
+        def observe():
+            nonlocal observed
+            if observed:
+                return
+            observed = True
+            # Set by the router once the request matched a route
+            route = ROUTE_LABELS.get(scope.get('endpoint'), 'other')
+            mode = ''
+            if route == '/api/search':
+                mode = search_mode_label(QueryParams(scope['query_string']).get('mode', 'all'))
+            metrics.observe_request(route, mode, status, timer)
+
+        async def send_timed(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                headers = MutableHeaders(raw=list(message['headers']))
+                headers['Server-Timing'] = timer.server_timing()
+                message['headers'] = headers.raw
+            await send(message)
+            if message['type'] == 'http.response.body' and not message.get('more_body', False):
+                observe()
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            observe()
+            _request_timer.reset(token)
+
+
+class JSONResponse(Response):
+    """JSON encoded exactly like Flask's jsonify() in server_postgresql.py"""
+    media_type = 'application/json'
+
+    def render(self, content):
+        with timed(_request_timer.get(), 'json'):
+            return (compact_json(content) + '\n').encode('utf-8')
+
+
+async def fetch(sql, params=()):
+    """Run one statement on its own pooled connection and return the rows as dicts"""
+    timer = _request_timer.get()
+    with timed(timer, 'connect'):
+        conn = await pool.acquire(timeout=DB_POOL_TIMEOUT)
+    try:
+        if timer is not None:
+            timer.queries += 1
+        with timed(timer, 'sql'):
+            rows = await conn.fetch(numbered_placeholders(sql), *params)
+    finally:
+        await pool.release(conn)
+    with timed(timer, 'fetch'):
+        return [dict(row) for row in rows]
+
+
+async def fetch_one(sql, params=()):
+    rows = await fetch(sql, params)
+    return rows[0] if rows else None
+
+
+def api_view(view):
+    """
+    Error handling shared by every route: pool exhaustion becomes
+    503 + Retry-After (as in the Flask server), anything else a 500
+    with the error message.
+    """
+    @functools.wraps(view)
+    async def wrapper(request):
+        try:
+            return await view(request)
+        except asyncio.TimeoutError:
+            return JSONResponse({'error': 'Database busy, please retry'}, status_code=503,
+                                headers={'Retry-After': '1'})
+        except Exception as e:
+            print(f"❌ {request.url.path} error: {e}")
+            return JSONResponse({'error': str(e)}, status_code=500)
+    return wrapper
+
+
+async def get_data_version():
+    """
+    Async counterpart of server_postgresql.get_data_version(): re-read
+    metadata['data_version'] at most every DATA_VERSION_CHECK_INTERVAL
+    seconds and clear search_cache when it changes.
+    """
+    global _data_version, _data_version_checked_at
+    checked_at = _data_version_checked_at
+    if checked_at is not None and time.monotonic() - checked_at < DATA_VERSION_CHECK_INTERVAL:
+        return _data_version
+
+    async with _data_version_lock:
+        checked_at = _data_version_checked_at
+        if checked_at is not None and time.monotonic() - checked_at < DATA_VERSION_CHECK_INTERVAL:
+            return _data_version
+
+        try:
+            row = await fetch_one("SELECT value FROM metadata WHERE key = 'data_version'")
+            version = row['value'] if row else None
+        except asyncpg.PostgresError as e:
+            print(f"⚠️ Could not read data_version: {e}")
+            version = _data_version
+
+        if checked_at is not None and version != _data_version:
+            search_cache.clear()
+        _data_version = version
+        _data_version_checked_at = time.monotonic()
+        return version
+
+
+async def fetch_definitions_batch(entry_ids, per_entry=5):
+    """Async fetch_definitions_batch(): {entry_id: [definition_text, ...]} in one query"""
+    if not entry_ids:
+        return {}
+
+    definitions_map = {}
+    for row in await fetch(DEFINITIONS_BATCH_SQL, (list(entry_ids), per_entry)):
+        definitions_map.setdefault(row['entry_id'], []).append(row['definition_text'])
+    return definitions_map
+
+
+async def run_search(query_norm, dictionary_id, mode, limit, sort='rank', fields=SEARCH_DEFAULT_FIELDS):
+    """Two-tier search: the same single statement and payload as server_postgresql.run_search()"""
+    rows = await fetch(*build_search_query(query_norm, dictionary_id, mode, limit, sort, fields))
+    return search_payload(rows, dictionary_id, fields)
+
+
+async def stream_search(conn, query_norm, dictionary_id, mode, limit, sort='rank', fields=SEARCH_DEFAULT_FIELDS):
+    """
+    Async server_postgresql.stream_search(): NDJSON lines from a
+    transaction-scoped asyncpg cursor, SEARCH_STREAM_BATCH rows at a time.
+    The connection is released when the stream ends or the client leaves.
+    """
+    full_text = wants_full_text(fields)
+    try:
+        async with conn.transaction(readonly=True):
+            tier1_keys = set()
+            tier1_query = build_tier1_query(query_norm, dictionary_id, limit, full_text=full_text)
+            if tier1_query:
+                sql, params = tier1_query
+                lines = []
+                for row in await conn.fetch(numbered_placeholders(sql), *params):
+                    row = dict(row)
+                    tier1_keys.add((row['sub_entry_id'], row['headword']))
+                    if dictionary_id != '3':
+                        # As search_payload(): dict 3 alone gets tier 1 as stored
+                        clean_display_root(row)
+                    lines.append(ndjson_line(project_fields(row, fields)))
+                if lines:
+                    yield ''.join(lines)
+                if tier1_keys and dictionary_id == '3':
+                    return
+
+            dict_filter, dict_params = build_dictionary_filter(dictionary_id)
+            tier2_sql, tier2_params = build_tier2_query(mode, query_norm, dict_filter, dict_params, limit,
+                                                        order_by_similarity=(sort == 'similarity'),
+                                                        full_text=full_text)
+
+            stream = await conn.cursor(numbered_placeholders(tier2_sql), *tier2_params)
+            emitted = len(tier1_keys)
+            while emitted < limit:
+                rows = await stream.fetch(SEARCH_STREAM_BATCH)
+                if not rows:
+                    break
+                rows = [dict(r) for r in rows if (r['entry_id'], r['headword']) not in tier1_keys]
+                rows = rows[:limit - emitted]
+                definitions_map = {}
+                if rows and wants_definitions(fields):
+                    entry_ids = [r['entry_id'] for r in rows]
+                    for d in await conn.fetch(numbered_placeholders(DEFINITIONS_BATCH_SQL), entry_ids, SEARCH_DEFINITIONS_PER_ENTRY):
+                        definitions_map.setdefault(d['entry_id'], []).append(d['definition_text'])
+                lines = []
+                for row in rows:
+                    row['definitions'] = definitions_map.get(row['entry_id'], [])
+                    clean_display_root(row)
+                    lines.append(ndjson_line(project_fields(row, fields)))
+                emitted += len(rows)
+                yield ''.join(lines)
+    except Exception as e:
+        # Headers are already sent; report the failure in-band
+        print(f"❌ Search stream error: {e}")
+        yield ndjson_line({'error': str(e)})
+    finally:
+        await pool.release(conn)
+
+
+@api_view
+async def health(request):
+    """Health check endpoint for monitoring"""
+    try:
+        row = await fetch_one('SELECT COUNT(*) FROM dictionaries')
+    except (OSError, asyncpg.PostgresError) as e:
+        return JSONResponse({'status': 'unhealthy', 'error': str(e)}, status_code=500)
+
+    return JSONResponse({
+        'status': 'healthy',
+        'database': 'connected',
+        'dictionaries': row['count'],
+        'environment': FLASK_ENV,
+        'pool': {
+            'size': pool.get_size(),
+            'min_size': pool.get_min_size(),
+            'max_size': pool.get_max_size(),
+            'idle': pool.get_idle_size(),
+            'in_use': pool.get_size() - pool.get_idle_size(),
+        }
+    })
+
+
+async def cache_stats(request):
+    """Hit, miss and eviction counters for the in-process search cache, plus the suggest index size"""
+    return JSONResponse({
+        'data_version': _data_version,
+        'search': search_cache.stats(),
+        'shared': None,
+        'suggest': _headword_index.stats() if _headword_index is not None else None
+    })
+
+
+def pool_metrics():
+    """asyncpg pool gauges for /metrics (the names server_postgresql.pool_metrics() uses)"""
+    if pool is None:
+        return []
+    return [
+        ('db_pool_connections', {'state': 'idle'}, pool.get_idle_size()),
+        ('db_pool_connections', {'state': 'in_use'}, pool.get_size() - pool.get_idle_size()),
+        ('db_pool_max_connections', {}, pool.get_max_size()),
+    ]
+
+
+metrics.describe('db_pool_connections', 'gauge', 'Pooled connections by state')
+metrics.describe('db_pool_max_connections', 'gauge', 'Pool size limit (ASYNC_DB_POOL_MAX)')
+metrics.add_collector(pool_metrics)
+
+
+async def prometheus_metrics(request):
+    """Request latency, phase timings and pool state in the Prometheus text format"""
+    if not METRICS_ENABLED:
+        return Response('Not found', status_code=404)
+    return Response(metrics.render(), media_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@api_view
+async def get_dictionaries(request):
+    """Get list of all dictionaries"""
+    dictionaries = await fetch('''
+        SELECT dictionary_id as id, name_arabic, name_english, author, year
+        FROM dictionaries
+        ORDER BY dictionary_id
+    ''')
+    return JSONResponse({'dictionaries': dictionaries})
+
+
+@api_view
+async def get_stats(request):
+    """Get dictionary statistics from dictionary_stats (live counts if the table is missing)"""
+    dictionary_id = request.query_params.get('dictionary_id')
+    specific = bool(dictionary_id and dictionary_id != 'all')
+    stats_key = int(dictionary_id) if specific else 0  # 0 = all dictionaries
+
+    try:
+        row = await fetch_one('''
+            SELECT entry_count, sub_entry_count
+            FROM dictionary_stats
+            WHERE dictionary_id = %s
+        ''', (stats_key,))
+        entry_count = row['entry_count'] if row else 0
+        sub_entry_count = row['sub_entry_count'] if row else 0
+    except asyncpg.exceptions.UndefinedTableError:
+        dict_filter = ' WHERE dictionary_id = %s' if specific else ''
+        dict_params = (stats_key,) if specific else ()
+        entry_row, sub_entry_row = await asyncio.gather(
+            fetch_one('SELECT COUNT(*) as total FROM entries' + dict_filter, dict_params),
+            fetch_one('SELECT COUNT(*) as total FROM sub_entries' + dict_filter, dict_params),
+        )
+        entry_count = entry_row['total']
+        sub_entry_count = sub_entry_row['total']
+
+    if specific:
+        stats = {
+            'dictionary_id': stats_key,
+            'entry_count': entry_count,
+            'sub_entry_count': sub_entry_count,
+            'total': entry_count + sub_entry_count
+        }
+    else:
+        stats = {
+            'total_entries': entry_count,
+            'total_sub_entries': sub_entry_count,
+            'total': entry_count + sub_entry_count
+        }
+    return JSONResponse(stats)
+
+
+@api_view
+async def search(request):
+    """
+    Two-tier search; same parameters and payload as /api/search in
+    server_postgresql.py (X-Cache: HIT / MISS).
+    """
+    args = request.query_params
+    query = args.get('q', '').strip()
+    dictionary_id = args.get('dictionary_id')
+    mode = args.get('mode', 'all')
+    sort = args.get('sort', 'rank')
+    stream = args.get('format') == 'ndjson'
+    try:
+        fields = parse_search_fields(args.get('fields'))
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+    if stream:
+        limit = min(int(args.get('limit', SEARCH_STREAM_MAX_ROWS)), SEARCH_STREAM_MAX_ROWS)
+    else:
+        limit = min(int(args.get('limit', '50')), 200)
+
+    if not query:
+        return JSONResponse({'error': 'Query parameter required'}, status_code=400)
+
+    query_norm = normalize_arabic(query)
+
+    if stream:
+        # Acquire before responding so pool exhaustion is still a 503
+        conn = await pool.acquire(timeout=DB_POOL_TIMEOUT)
+        return StreamingResponse(stream_search(conn, query_norm, dictionary_id, mode, limit, sort, fields),
+                                 media_type='application/x-ndjson')
+
+    await get_data_version()
+    cache_key = (query_norm, dictionary_id or 'all', mode, limit, sort, ','.join(fields or ('all',)))
+    payload = search_cache.get(cache_key)
+    cache_status = 'HIT'
+    if payload is None:
+        cache_status = 'MISS'
+        payload = await run_search(query_norm, dictionary_id, mode, limit, sort, fields)
+        search_cache.set(cache_key, payload)
+
+    return JSONResponse(dict(payload, query=query), headers={'X-Cache': cache_status})
+
+
+@api_view
+async def lookup_batch(request):
+    """Batch exact lookup; same body and payload as /api/lookup/batch in server_postgresql.py"""
+    try:
+        body = await request.json()
+    except ValueError:
+        body = None
+    try:
+        words, dictionary_id, per_word = parse_batch_lookup(body)
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+
+    norms = sorted({normalize_arabic(w.strip()) for w in words} - {''})
+    if not norms:
+        return JSONResponse(assemble_batch_lookup(words, [], [], {}))
+
+    entries_query, sub_entries_query = build_batch_lookup_queries(norms, dictionary_id, per_word)
+    entry_rows, sub_entry_rows = await asyncio.gather(fetch(*entries_query), fetch(*sub_entries_query))
+    definitions_map = await fetch_definitions_batch({r['entry_id'] for r in entry_rows})
+
+    return JSONResponse(assemble_batch_lookup(words, entry_rows, sub_entry_rows, definitions_map))
+
+
+async def get_headword_index():
+    """
+    The worker's HeadwordIndex, loaded on first use and rebuilt when the
+    data version changes. The CPU-bound build runs in a thread so it does
+    not stall other requests on the event loop.
+    """
+    global _headword_index
+    version = await get_data_version()
+    index = _headword_index
+    if index is not None and index.data_version == version:
+        return index
+
+    async with _headword_index_lock:
+        index = _headword_index
+        if index is not None and index.data_version == version:
+            return index
+
+        async with pool.acquire(timeout=DB_POOL_TIMEOUT) as conn:
+            rows = await conn.fetch(HEADWORD_INDEX_SQL)
+        index = await asyncio.to_thread(HeadwordIndex, rows, version)
+        print(f"✅ Suggest index: {index.size:,} headwords, "
+              f"{index.memory_bytes() / 1024 / 1024:.1f} MB, built in {index.build_ms} ms")
+        _headword_index = index
+        return index
+
+
+@api_view
+async def suggest(request):
+    """Headword autocomplete; same parameters and payload as /api/suggest in server_postgresql.py"""
+    args = request.query_params
+    query = args.get('q', '').strip()
+    limit = min(int(args.get('limit', 10)), SUGGEST_MAX_LIMIT)
+    dictionary_id = args.get('dictionary_id')
+    dictionary_id = int(dictionary_id) if dictionary_id and dictionary_id != 'all' else None
+
+    prefix = fold_arabic(query)
+    if not prefix:
+        return JSONResponse({'error': 'Query parameter required'}, status_code=400)
+
+    suggestions = (await get_headword_index()).suggest(prefix, limit, dictionary_id)
+    return JSONResponse({'query': query, 'count': len(suggestions), 'suggestions': suggestions})
+
+
+@api_view
+async def get_entry(request):
+    """Get full entry details (entry and definitions fetched concurrently)"""
+    entry_id = request.path_params['entry_id']
+    entry, definitions = await asyncio.gather(
+        fetch_one(ENTRY_SQL, (entry_id,)),
+        fetch(ENTRY_DEFINITIONS_SQL, (entry_id,)),
+    )
+
+    if not entry:
+        return JSONResponse({'error': 'Entry not found'}, status_code=404)
+
+    entry['definitions'] = definitions
+    clean_display_root(entry)
+    return JSONResponse(entry)
+
+
+@api_view
+async def get_chapters(request):
+    """Get chapters for a dictionary"""
+    dictionary_id = request.query_params.get('dictionary_id')
+    if not dictionary_id or dictionary_id == 'all':
+        return JSONResponse({'error': 'dictionary_id required'}, status_code=400)
+
+    chapters = await fetch('''
+        SELECT chapter_id, name_arabic, chapter_order
+        FROM chapters
+        WHERE dictionary_id = %s
+        ORDER BY chapter_order
+    ''', (int(dictionary_id),))
+    return JSONResponse(chapters)
+
+
+@api_view
+async def api_poets(request):
+    """List poets with optional search; keyset (after=) or offset pagination"""
+    args = request.query_params
+    q = args.get('q', '').strip()
+    limit = min(int(args.get('limit', 50)), 200)
+    offset = int(args.get('offset', 0))
+    after = args.get('after')
+
+    where = []
+    params = []
+    if q:
+        where.append('(name_arabic ILIKE %s OR bio_arabic ILIKE %s)')
+        like = f'%{q}%'
+        params.extend([like, like])
+    if after:
+        try:
+            sort_key, last_poet_id = decode_cursor(after, 2)
+        except ValueError:
+            return JSONResponse({'error': 'Invalid after cursor'}, status_code=400)
+        where.append(f'({POETS_SORT_KEY}, poet_id) > (%s, %s)')
+        params.extend([sort_key, last_poet_id])
+        offset = 0
+
+    sql = 'SELECT poet_id, name_arabic, bio_arabic, poems_count FROM poets'
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    sql += f' ORDER BY {POETS_SORT_KEY}, poet_id ASC LIMIT %s OFFSET %s'
+    params.extend([limit, offset])
+
+    poets = await fetch(sql, params)
+
+    next_cursor = None
+    if len(poets) == limit:
+        last = poets[-1]
+        last_count = last['poems_count'] if last['poems_count'] is not None else -1
+        next_cursor = encode_cursor(-last_count, last['poet_id'])
+
+    return JSONResponse({'count': len(poets), 'poets': poets, 'next_cursor': next_cursor})
+
+
+@api_view
+async def api_poet(request):
+    """Get poet details and sample poems (fetched concurrently)"""
+    poet_id = request.path_params['poet_id']
+    poet, poems = await asyncio.gather(
+        fetch_one('SELECT poet_id, name_arabic, bio_arabic, poems_count FROM poets WHERE poet_id = %s', (poet_id,)),
+        fetch('SELECT poem_id, title_arabic, verses_count FROM poems WHERE poet_id = %s ORDER BY poem_id LIMIT 20', (poet_id,)),
+    )
+    if not poet:
+        return JSONResponse({'error': 'Poet not found'}, status_code=404)
+
+    poet['poems_preview'] = poems
+    return JSONResponse(poet)
+
+
+@api_view
+async def api_poems(request):
+    """List poems, filter by poet_id or search title/text; keyset (after=) or offset pagination"""
+    args = request.query_params
+    poet_id = args.get('poet_id')
+    q = args.get('q', '').strip()
+    limit = min(int(args.get('limit', 50)), 200)
+    offset = int(args.get('offset', 0))
+    after = args.get('after')
+
+    params = []
+    sql = 'SELECT poem_id, poet_id, title_arabic, verses_count FROM poems'
+    where = []
+    if poet_id:
+        where.append('poet_id = %s')
+        params.append(int(poet_id))
+    if q:
+        where.append('(title_arabic ILIKE %s OR full_text ILIKE %s)')
+        like = f'%{q}%'
+        params.extend([like, like])
+    if after:
+        try:
+            (last_poem_id,) = decode_cursor(after, 1)
+        except ValueError:
+            return JSONResponse({'error': 'Invalid after cursor'}, status_code=400)
+        where.append('poem_id < %s')
+        params.append(last_poem_id)
+        offset = 0
+
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    sql += ' ORDER BY poem_id DESC LIMIT %s OFFSET %s'
+    params.extend([limit, offset])
+
+    poems = await fetch(sql, params)
+    next_cursor = encode_cursor(poems[-1]['poem_id']) if len(poems) == limit else None
+
+    return JSONResponse({'count': len(poems), 'poems': poems, 'next_cursor': next_cursor})
+
+
+@api_view
+async def api_poem(request):
+    """Get full poem with verses (and ?annotate=1 word links), fetched concurrently"""
+    poem_id = request.path_params['poem_id']
+    annotate = request.query_params.get('annotate', '') in ('1', 'true')
+    queries = [
+        fetch_one('SELECT p.*, pt.name_arabic as topic, m.name_arabic as meter, po.name_arabic as poet_name FROM poems p LEFT JOIN poetry_topics pt ON p.topic_id = pt.topic_id LEFT JOIN poetry_meters m ON p.meter_id = m.meter_id LEFT JOIN poets po ON p.poet_id = po.poet_id WHERE p.poem_id = %s', (poem_id,)),
+        fetch('SELECT verse_number, first_hemistich, second_hemistich, full_verse FROM verses WHERE poem_id = %s ORDER BY verse_number', (poem_id,)),
+    ]
+    if annotate:
+        queries.append(fetch(POEM_TOKENS_SQL, (poem_id,)))
+    poem, verses, *token_rows = await asyncio.gather(*queries)
+    if not poem:
+        return JSONResponse({'error': 'Poem not found'}, status_code=404)
+
+    poem['verses'] = verses
+    if annotate:
+        annotate_verses(verses, token_rows[0])
+    return JSONResponse(poem)
+
+
+@api_view
+async def api_poetry_search(request):
+    """Search poem titles and verses by keyword, ignoring diacritics (build_poetry_search_query())"""
+    args = request.query_params
+    q = args.get('q', '').strip()
+    limit = min(int(args.get('limit', 50)), 200)
+    if not q:
+        return JSONResponse({'error': 'q parameter required'}, status_code=400)
+
+    poems = await fetch(*build_poetry_search_query(q, limit))
+
+    return JSONResponse({'count': len(poems), 'results': poems})
+
+
+async def init_connection(conn):
+    # psycopg2 parses real (float4) from its text form, e.g. ts_rank() = 0.0607927;
+    # the default binary codec would widen it to 0.060792699456214905.
+    await conn.set_type_codec('float4', schema='pg_catalog', encoder=str, decoder=float, format='text')
+    # json columns arrive decoded, as psycopg2 returns them
+    await conn.set_type_codec('json', schema='pg_catalog', encoder=json.dumps, decoder=json.loads)
+
+
+# asyncpg spelling of EXPORT_FORMATS[...]['copy_options']
+ASYNC_COPY_OPTIONS = {
+    'csv': {'format': 'csv', 'header': True},
+    'ndjson': {'format': 'csv', 'delimiter': '\x02', 'quote': '\x01'},
+}
+
+
+async def stream_export(conn, copy_sql, object_id, fmt, encoder):
+    """
+    Run COPY ... TO STDOUT as a task feeding a bounded queue and yield its
+    encoded output; a slow client throttles the COPY.
+    """
+    chunks = asyncio.Queue(maxsize=16)
+
+    async def put(data):
+        # asyncpg hands out bytearrays; StreamingResponse only sends bytes
+        await chunks.put(bytes(data))
+
+    async def run_copy():
+        try:
+            await conn.copy_from_query(copy_sql, object_id, output=put, **ASYNC_COPY_OPTIONS[fmt])
+        finally:
+            await chunks.put(None)
+
+    task = asyncio.create_task(run_copy())
+    completed = False
+    error = None
+    try:
+        while (chunk := await chunks.get()) is not None:
+            chunk = encoder.encode(chunk)
+            if chunk:
+                yield chunk
+        yield encoder.finish()
+        completed = True
+    finally:
+        if not task.done():
+            task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            error = e
+        await pool.release(conn)
+        encoder.log(error or (None if completed else 'client disconnected'))
+
+
+async def export_response(request, kind, object_id):
+    """Same parameters and output as server_postgresql.export_response()"""
+    fmt = request.query_params.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return JSONResponse({'error': 'format must be csv or ndjson'}, status_code=400)
+    gzip_output = request.query_params.get('gzip', '1') != '0'
+
+    if not await fetch_one(EXPORTS[kind]['exists'], (object_id,)):
+        return JSONResponse({'error': EXPORTS[kind]['not_found']}, status_code=404)
+
+    conn = await pool.acquire(timeout=DB_POOL_TIMEOUT)
+    filename = f'{kind}-{object_id}.{fmt}' + ('.gz' if gzip_output else '')
+    return StreamingResponse(
+        stream_export(conn, numbered_placeholders(build_export_query(kind, fmt)), object_id, fmt,
+                      ExportEncoder(filename, gzip_output)),
+        media_type='application/gzip' if gzip_output else EXPORT_FORMATS[fmt]['mimetype'],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+
+@api_view
+async def export_dictionary(request):
+    """Export every entry of a dictionary with its definitions"""
+    return await export_response(request, 'dictionary', request.path_params['dictionary_id'])
+
+
+@api_view
+async def export_poet(request):
+    """Export every poem of a poet with its verses"""
+    return await export_response(request, 'poet', request.path_params['poet_id'])
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    """Open the asyncpg pool for this worker and close it on shutdown"""
+    global pool
+    pool = await asyncpg.create_pool(
+        DATABASE_URL,
+        min_size=ASYNC_DB_POOL_MIN,
+        max_size=ASYNC_DB_POOL_MAX,
+        max_inactive_connection_lifetime=DB_POOL_MAX_LIFETIME,
+        server_settings={'search_path': 'public'},
+        init=init_connection,
+    )
+    print(f"✅ asyncpg pool ready ({ASYNC_DB_POOL_MIN}-{ASYNC_DB_POOL_MAX} connections)")
+    try:
+        yield
+    finally:
+        await pool.close()
+
+
+routes = [
+    Route('/health', health),
+    Route('/api/cache/stats', cache_stats),
+    Route('/metrics', prometheus_metrics),
+    Route('/api/dictionaries', get_dictionaries),
+    Route('/api/stats', get_stats),
+    Route('/api/search', search),
+    Route('/api/suggest', suggest),
+    Route('/api/lookup/batch', lookup_batch, methods=['POST']),
+    Route('/api/entry/{entry_id:int}', get_entry),
+    Route('/api/chapters', get_chapters),
+    Route('/api/poets', api_poets),
+    Route('/api/poet/{poet_id:int}', api_poet),
+    Route('/api/poems', api_poems),
+    Route('/api/poem/{poem_id:int}', api_poem),
+    Route('/api/poetry/search', api_poetry_search),
+    Route('/api/export/dictionary/{dictionary_id:int}', export_dictionary),
+    Route('/api/export/poet/{poet_id:int}', export_poet),
+]
+
+# Metrics label per endpoint: /api/entry/{entry_id:int} -> /api/entry/{entry_id}
+ROUTE_LABELS = {route.endpoint: re.sub(r'\{([^:}]+):[^}]+\}', r'{\1}', route.path) for route in routes}
+
+app = Starlette(
+    routes=routes,
+    middleware=[
+        Middleware(MetricsMiddleware),
+        Middleware(CORSMiddleware, allow_origins=ALLOWED_ORIGINS, allow_credentials=True),
+        Middleware(CompressionMiddleware),
+    ],
+    lifespan=lifespan,
+)
+
+if __name__ == '__main__':
+    import uvicorn
+
+    print("=" * 80)
+    print("Arabic Dictionary - Async PostgreSQL Server")
+    print("=" * 80)
+    print(f"Database: {DATABASE_URL.split('@')[1] if '@' in DATABASE_URL else DATABASE_URL}")
+    print(f"Server: http://localhost:{PORT}")
+    print("=" * 80)
+
+    uvicorn.run('server_asgi:app', host='0.0.0.0', port=PORT, workers=int(os.getenv('WEB_CONCURRENCY', 1)))
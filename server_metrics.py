@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Request Timing and Metrics
+==========================
+
+Per-request phase timings and Prometheus metrics, used by
+server_postgresql.py, server_asgi.py and backend/simple_server.py.
+
+A RequestTimer is started for every request. The server's database and
+encoding code adds the time spent in each phase to it:
+
+    connect   checking out (or opening) a database connection
+    sql       executing statements
+    fetch     reading rows and building result objects
+    json      JSON encoding
+    compress  gzip / brotli of the response body
+
+The phases and the number of SQL statements are sent back in a
+Server-Timing header, with 'app' (the rest) and 'total'. When a request
+finishes, Metrics adds it to counters and latency histograms per route
+and search mode. /metrics renders those, plus gauges such as the
+connection pool's, in the Prometheus text format.
+
+Metrics live in the worker process that served the request. With several
+workers (gunicorn --workers, uvicorn --workers) set METRICS_DIR to a
+directory the workers share. Each worker then writes its counters there
+about once a second, and /metrics adds up every worker's file, so whichever
+worker is scraped answers for all of them. Clear the directory when the
+server is restarted.
+
+Environment variables:
+    METRICS_ENABLED - Server-Timing headers and /metrics (default: 1)
+    METRICS_DIR - Directory shared by the worker processes (default: per-process metrics)
+"""
+
+import contextlib
+import glob
+import json
+import os
+import threading
+import time
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') not in ('0', 'false', 'no')
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+METRICS_PREFIX = 'qamoos_'
+METRICS_FLUSH_INTERVAL = 1.0  # seconds between a worker's writes to METRICS_DIR
+
+# Request latency histogram buckets (seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Server-Timing names, in header order
+PHASE_DESCRIPTIONS = {
+    'connect': 'DB connection',
+    'sql': 'SQL',
+    'fetch': 'Row fetch',
+    'json': 'JSON encoding',
+    'compress': 'Compression',
+}
+
+# The 'mode' label of /api/search; anything else is reported as 'other'
+SEARCH_MODES = {'all', 'exact', 'starts', 'contains', 'fts', 'root'}
+
+
+def search_mode_label(mode):
+    return mode if mode in SEARCH_MODES else 'other'
+
+
+def timed(timer, phase):
+    """timer.phase(phase), or a no-op when there is no timer (outside a request)"""
+    return timer.phase(phase) if timer is not None else contextlib.nullcontext()
+
+
+class RequestTimer:
+    """Phase durations and SQL statement count of one request"""
+
+    __slots__ = ('start', 'phases', 'queries')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = {}
+        self.queries = 0
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def server_timing(self):
+        """
+        Server-Timing header value. Phases that overlap (the async server
+        runs some queries concurrently) can add up to more than 'total';
+        'app' is whatever the phases do not account for.
+        """
+        total = self.elapsed()
+        parts = []
+        for name, description in PHASE_DESCRIPTIONS.items():
+            if name in self.phases:
+                if name == 'sql':
+                    description = f'{description} ({self.queries} statement{"" if self.queries == 1 else "s"})'
+                parts.append(f'{name};dur={self.phases[name] * 1000:.2f};desc="{description}"')
+        other = max(total - sum(self.phases.values()), 0.0)
+        parts.append(f'app;dur={other * 1000:.2f}')
+        parts.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(parts)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+class Metrics:
+    """
+    Counters and histograms of finished requests, plus gauges read from
+    collector functions when rendered. Thread-safe. See the module
+    docstring for METRICS_DIR.
+    """
+
+    def __init__(self, directory=METRICS_DIR, buckets=LATENCY_BUCKETS):
+        self.directory = directory
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters = {}    # (name, labels) -> value; labels is a sorted tuple of pairs
+        self._histograms = {}  # (name, labels) -> [count per bucket..., count above, sum]
+        self._collectors = []
+        self._descriptions = {}
+        self._dirty = False
+        self._flusher_pid = None
+
+        self.describe('http_requests_total', 'counter', 'Requests by route, search mode and status')
+        self.describe('http_request_duration_seconds', 'histogram',
+                      'Request latency by route and search mode (until the last byte of the body)')
+        self.describe('request_phase_seconds_total', 'counter',
+                      'Time spent per phase (connect, sql, fetch, json, compress) by route')
+        self.describe('db_queries_total', 'counter', 'SQL statements executed by route')
+
+    def describe(self, name, kind, help_text):
+        """Declare a metric's type and HELP line (name without the qamoos_ prefix)"""
+        self._descriptions[name] = (kind, help_text)
+
+    def add_collector(self, collector):
+        """
+        Register a function called on every render. It returns
+        (name, labels dict, value) samples, e.g. connection pool gauges.
+        """
+        self._collectors.append(collector)
+
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            self._dirty = True
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[i] += 1
+                    break
+            else:
+                histogram[len(self.buckets)] += 1
+            histogram[-1] += value
+            self._dirty = True
+
+    def observe_request(self, route, mode, status, timer):
+        """Record a finished request"""
+        labels = {'route': route, 'mode': mode}
+        self.inc('http_requests_total', dict(labels, status=str(status)))
+        self.observe('http_request_duration_seconds', labels, timer.elapsed())
+        for phase, seconds in timer.phases.items():
+            self.inc('request_phase_seconds_total', {'route': route, 'phase': phase}, seconds)
+        if timer.queries:
+            self.inc('db_queries_total', {'route': route}, timer.queries)
+        if self.directory:
+            self._start_flusher()
+
+    def _collect(self):
+        samples = []
+        for collector in self._collectors:
+            try:
+                samples.extend(collector())
+            except Exception as e:
+                print(f"⚠️ Metrics collector {collector.__name__} failed: {e}")
+        return samples
+
+    def _snapshot(self):
+        with self._lock:
+            self._dirty = False
+            return {
+                'pid': os.getpid(),
+                'counters': [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                'histograms': [[name, list(labels), list(values)] for (name, labels), values in self._histograms.items()],
+            }
+
+    def flush(self):
+        """Write this process's counters to METRICS_DIR (atomically)"""
+        snapshot = self._snapshot()
+        snapshot['collected'] = [[name, sorted(labels.items()), value] for name, labels, value in self._collect()]
+        path = os.path.join(self.directory, f'metrics-{snapshot["pid"]}.json')
+        os.makedirs(self.directory, exist_ok=True)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.replace(path + '.tmp', path)
+
+    def _start_flusher(self):
+        """Flush from a daemon thread while there is something new (one thread per process)"""
+        if self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+
+        def run():
+            while True:
+                time.sleep(METRICS_FLUSH_INTERVAL)
+                if self._dirty:
+                    try:
+                        self.flush()
+                    except OSError as e:
+                        print(f"⚠️ Could not write metrics to {self.directory}: {e}")
+
+        threading.Thread(target=run, name='metrics-flush', daemon=True).start()
+
+    @staticmethod
+    def _is_running(pid):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except OSError:
+            pass
+        return True
+
+    def _merged(self):
+        """
+        (counters, histograms, samples) of this process, or of every
+        worker in METRICS_DIR. Counters of workers that have exited are
+        kept; their gauges are not.
+        """
+        if not self.directory:
+            snapshot = self._snapshot()
+            snapshots = [snapshot]
+            samples = [(name, tuple(sorted(labels.items())), value) for name, labels, value in self._collect()]
+        else:
+            self.flush()
+            snapshots = []
+            samples = []
+            for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+                try:
+                    with open(path, encoding='utf-8') as f:
+                        snapshot = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                snapshots.append(snapshot)
+                if self._is_running(snapshot['pid']):
+                    samples.extend((name, tuple(map(tuple, labels)) + (('pid', str(snapshot['pid'])),), value)
+                                   for name, labels, value in snapshot.get('collected', []))
+
+        counters = {}
+        histograms = {}
+        for snapshot in snapshots:
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, values in snapshot['histograms']:
+                key = (name, tuple(map(tuple, labels)))
+                if key in histograms:
+                    histograms[key] = [a + b for a, b in zip(histograms[key], values)]
+                else:
+                    histograms[key] = list(values)
+        return counters, histograms, samples
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format (version 0.0.4)"""
+        counters, histograms, samples = self._merged()
+
+        families = {}
+        for (name, labels), value in sorted(counters.items()):
+            families.setdefault(name, []).append(f'{METRICS_PREFIX}{name}{_format_labels(labels)} {_format_value(value)}')
+        for (name, labels), values in sorted(histograms.items()):
+            lines = families.setdefault(name, [])
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f'{METRICS_PREFIX}{name}_bucket{_format_labels(labels + (("le", repr(bound)),))} {cumulative}')
+            cumulative += values[len(self.buckets)]
+            lines.append(f'{METRICS_PREFIX}{name}_bucket{_format_labels(labels + (("le", "+Inf"),))} {cumulative}')
+            lines.append(f'{METRICS_PREFIX}{name}_sum{_format_labels(labels)} {_format_value(values[-1])}')
+            lines.append(f'{METRICS_PREFIX}{name}_count{_format_labels(labels)} {cumulative}')
+        for name, labels, value in sorted(samples):
+            families.setdefault(name, []).append(f'{METRICS_PREFIX}{name}{_format_labels(labels)} {_format_value(value)}')
+
+        output = []
+        for name in sorted(families):
+            kind, help_text = self._descriptions.get(name, ('untyped', ''))
+            output.append(f'# HELP {METRICS_PREFIX}{name} {help_text}')
+            output.append(f'# TYPE {METRICS_PREFIX}{name} {kind}')
+            output.extend(families[name])
+        return '\n'.join(output) + '\n'
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Static Asset Cache
+==================
+
+In-memory copy of the frontend pages and assets (frontend-deploy/), used by
+server_postgresql.py and backend/simple_server.py instead of reading the
+file from disk on every request.
+
+Every servable file under the asset root is read once at startup and kept
+with a gzip and, when the optional 'brotli' package is installed, a brotli
+variant compressed at the highest level. Each variant has its own strong
+ETag, so revalidations are answered with 304 without touching the disk.
+
+Only files inside the root, with an extension in STATIC_EXTENSIONS and no
+hidden or '_'-prefixed path segment (Cloudflare Pages' _headers,
+_worker.js, ...) are served; any other path is a miss. With reload on
+(development), a file is re-read when its mtime changes.
+
+Environment variables:
+    STATIC_ROOT - Asset directory (default: frontend-deploy next to this file)
+    STATIC_RELOAD - Re-read changed files (default: 1 when FLASK_ENV=development)
+    STATIC_MAX_AGE - Cache-Control max-age in seconds for non-HTML assets (default: 3600)
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import time
+
+try:
+    import brotli  # optional: gzip variants only without it
+except ImportError:
+    brotli = None
+
+STATIC_ROOT = os.getenv('STATIC_ROOT', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'frontend-deploy'))
+STATIC_RELOAD = os.getenv('STATIC_RELOAD', '1' if os.getenv('FLASK_ENV', 'development') == 'development' else '0') == '1'
+STATIC_MAX_AGE = int(os.getenv('STATIC_MAX_AGE', 3600))
+
+STATIC_EXTENSIONS = {
+    '.html', '.css', '.js', '.json', '.xml', '.txt', '.webmanifest',
+    '.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico', '.webp', '.woff', '.woff2',
+}
+COMPRESSIBLE_EXTENSIONS = {'.html', '.css', '.js', '.json', '.xml', '.txt', '.webmanifest', '.svg'}
+PRECOMPRESS_MIN_BYTES = 256
+
+# Content-addressed names (app.3f9a1c2e.js) and the chapter files _headers
+# already marks immutable never change under the same URL
+IMMUTABLE_PATTERN = re.compile(r'\.[0-9a-f]{8,}\.\w+$|^grammar/data/books/')
+
+# Pages and the service worker must pick up a deploy immediately; they are
+# revalidated on every use, which the ETag turns into a 304
+REVALIDATE_PATTERN = re.compile(r'\.html$|^service-worker\.js$')
+
+mimetypes.add_type('application/manifest+json', '.webmanifest')
+
+
+class StaticAsset:
+    """One file with its compressed variants and per-variant ETags"""
+
+    __slots__ = ('path', 'mimetype', 'mtime', 'variants', 'etags', 'cache_control')
+
+    def __init__(self, path, file_path):
+        with open(file_path, 'rb') as f:
+            body = f.read()
+        self.path = path
+        self.mtime = os.stat(file_path).st_mtime
+        self.mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.variants = {None: body}
+
+        extension = os.path.splitext(path)[1].lower()
+        if extension in COMPRESSIBLE_EXTENSIONS and len(body) >= PRECOMPRESS_MIN_BYTES:
+            gz = gzip.compress(body, 9, mtime=0)
+            if len(gz) < len(body):
+                self.variants['gzip'] = gz
+            if brotli is not None:
+                br = brotli.compress(body, quality=11)
+                if len(br) < len(body):
+                    self.variants['br'] = br
+
+        digest = hashlib.sha1(body).hexdigest()[:20]
+        self.etags = {encoding: f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+                      for encoding in self.variants}
+
+        if IMMUTABLE_PATTERN.search(path):
+            self.cache_control = 'public, max-age=31536000, immutable'
+        elif REVALIDATE_PATTERN.search(path):
+            self.cache_control = 'no-cache'
+        else:
+            self.cache_control = f'public, max-age={STATIC_MAX_AGE}'
+
+    def select(self, encoding):
+        """(encoding, body, etag) for a negotiated encoding; identity when there is no such variant"""
+        if encoding not in self.variants:
+            encoding = None
+        return encoding, self.variants[encoding], self.etags[encoding]
+
+    def is_current(self, if_none_match):
+        """Whether an If-None-Match header names this file's content (any variant)"""
+        if not if_none_match:
+            return False
+        for tag in if_none_match.split(','):
+            tag = tag.strip()
+            if tag.startswith('W/'):
+                tag = tag[2:]
+            if tag == '*' or tag in self.etags.values():
+                return True
+        return False
+
+    @property
+    def negotiated(self):
+        """Whether the response depends on Accept-Encoding (Vary)"""
+        return len(self.variants) > 1
+
+
+class StaticAssetCache:
+    """
+    Allow-listed, in-memory view of an asset directory. get() maps a URL
+    path to a StaticAsset, or None when the path is not servable.
+    """
+
+    def __init__(self, root, reload=False):
+        self.root = os.path.realpath(root)
+        self.reload = reload
+        self._assets = {}
+
+    def load(self):
+        """Read every servable file under the root; returns self"""
+        start = time.perf_counter()
+        assets = {}
+        if not os.path.isdir(self.root):
+            print(f"⚠️  Static root {self.root} not found, no static files will be served")
+        for directory, subdirs, files in os.walk(self.root):
+            subdirs[:] = [d for d in subdirs if not d.startswith(('.', '_'))]
+            for name in files:
+                path = os.path.relpath(os.path.join(directory, name), self.root).replace(os.sep, '/')
+                file_path = self._file_path(path)
+                if file_path and self.clean_path(path) == path:
+                    assets[path] = StaticAsset(path, file_path)
+        self._assets = assets
+
+        stats = self.stats()
+        br = f"{stats['br_bytes'] / 1024:.0f} KB" if stats['br_bytes'] is not None else 'n/a'
+        print(f"✅ Static assets: {stats['files']} files from {self.root}, {stats['bytes'] / 1024:.0f} KB "
+              f"(gzip {stats['gzip_bytes'] / 1024:.0f} KB, br {br}) "
+              f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return self
+
+    @staticmethod
+    def clean_path(path):
+        """The asset key for a URL path, or None if it may not be served"""
+        path = path.lstrip('/')
+        parts = path.split('/')
+        if not path or any(p in ('', '.', '..') or p.startswith(('.', '_')) or '\\' in p for p in parts):
+            return None
+        if os.path.splitext(path)[1].lower() not in STATIC_EXTENSIONS:
+            return None
+        return path
+
+    def get(self, path):
+        path = self.clean_path(path)
+        if path is None:
+            return None
+        asset = self._assets.get(path)
+        if self.reload:
+            asset = self._refresh(path, asset)
+        return asset
+
+    def _file_path(self, path):
+        """Resolved file for an asset key, or None if it (or a symlink) points outside the root"""
+        file_path = os.path.realpath(os.path.join(self.root, path))
+        return file_path if file_path.startswith(self.root + os.sep) else None
+
+    def _refresh(self, path, asset):
+        """Development: pick up edited, added and deleted files"""
+        file_path = self._file_path(path)
+        if file_path is None:
+            return None
+        try:
+            mtime = os.stat(file_path).st_mtime
+        except OSError:
+            self._assets.pop(path, None)
+            return None
+        if asset is None or asset.mtime != mtime:
+            asset = StaticAsset(path, file_path)
+            self._assets[path] = asset
+            print(f"🔄 Static asset reloaded: {path}")
+        return asset
+
+    def stats(self):
+        assets = list(self._assets.values())
+        return {
+            'root': self.root,
+            'files': len(assets),
+            'reload': self.reload,
+            'bytes': sum(len(a.variants[None]) for a in assets),
+            'gzip_bytes': sum(len(a.variants.get('gzip', a.variants[None])) for a in assets),
+            'br_bytes': sum(len(a.variants.get('br', a.variants[None])) for a in assets) if brotli else None,
+        }
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fixtures for the query-plan regression suite (test_query_plans.py)
+==================================================================
+
+Every session builds a scratch database from tests/fixtures/corpus.sql
+plus migrations/*.sql, then points server_postgresql.py at it.
+
+Where the database comes from:
+    QAMOOS_TEST_DATABASE_URL - superuser URL of an existing server, e.g.
+        postgresql://postgres@localhost:5432/postgres; the scratch database
+        (qamoos_plan_test) is created on it and dropped afterwards.
+    Otherwise a throwaway cluster is started with initdb / pg_ctl, found in
+    PG_BINDIR, on PATH or via pg_config --bindir (initdb refuses to run as
+    root). The suite is skipped when neither is possible.
+
+Options:
+    --update-plan-baseline   Re-record tests/fixtures/plan_baseline.json
+    --plan-tolerance=0.2     Allowed cost / buffer growth over the baseline
+    --require-trgm           Fail when pg_trgm is missing (PLAN_REQUIRE_TRGM=1), so
+                             the trigram index checks cannot be skipped silently
+"""
+
+import glob
+import os
+import re
+import shutil
+import subprocess
+import sys
+from urllib.parse import urlsplit, urlunsplit
+
+import pytest
+
+psycopg2 = pytest.importorskip('psycopg2')
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(REPO_ROOT, 'tests', 'fixtures')
+MIGRATIONS_DIR = os.path.join(REPO_ROOT, 'migrations')
+TEST_DATABASE = 'qamoos_plan_test'
+LOCAL_CLUSTER_PORT = 54329
+# pg_trgm only takes letters the ctype calls alphanumeric as word
+# characters: under LC_CTYPE 'C' Arabic text has no trigrams at all
+TEST_CTYPE = 'C.UTF-8'
+
+sys.path.insert(0, REPO_ROOT)
+
+# Read by server_postgresql at import: every request must reach the database
+os.environ.setdefault('SEARCH_CACHE_SIZE', '0')
+os.environ.setdefault('SHARED_CACHE_URL', '')
+os.environ.setdefault('STATIC_RELOAD', '0')
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('query plans')
+    group.addoption('--update-plan-baseline', action='store_true', default=False,
+                    help='re-record tests/fixtures/plan_baseline.json instead of comparing against it')
+    group.addoption('--require-trgm', action='store_true', default=os.getenv('PLAN_REQUIRE_TRGM') == '1',
+                    help='fail instead of skipping the trigram index checks when pg_trgm is not available')
+    group.addoption('--plan-tolerance', type=float, default=float(os.getenv('PLAN_TOLERANCE', 0.2)),
+                    help='allowed relative cost / buffer growth over the baseline (default: 0.2)')
+
+
+def split_sql(script):
+    """Split a SQL script into statements on ';' outside quotes, comments and $$ bodies"""
+    statements = []
+    current = []
+    dollar_tag = None
+    i = 0
+    while i < len(script):
+        if dollar_tag:
+            if script.startswith(dollar_tag, i):
+                current.append(dollar_tag)
+                i += len(dollar_tag)
+                dollar_tag = None
+            else:
+                current.append(script[i])
+                i += 1
+            continue
+
+        char = script[i]
+        if script.startswith('--', i):
+            end = script.find('\n', i)
+            i = len(script) if end < 0 else end
+        elif char == "'":
+            end = i + 1
+            while True:
+                end = script.index("'", end)
+                if script.startswith("''", end):
+                    end += 2
+                    continue
+                break
+            current.append(script[i:end + 1])
+            i = end + 1
+        elif char == '$' and re.match(r'\$\w*\$', script[i:]):
+            dollar_tag = re.match(r'\$\w*\$', script[i:]).group()
+            current.append(dollar_tag)
+            i += len(dollar_tag)
+        elif char == ';':
+            statement = ''.join(current).strip()
+            if statement:
+                statements.append(statement)
+            current = []
+            i += 1
+        else:
+            current.append(char)
+            i += 1
+
+    statement = ''.join(current).strip()
+    if statement:
+        statements.append(statement)
+    return statements
+
+
+def with_database(url, database):
+    """url pointing at another database on the same server"""
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme, parts.netloc, '/' + database, parts.query, parts.fragment))
+
+
+def find_bindir():
+    bindir = os.getenv('PG_BINDIR')
+    if bindir:
+        return bindir
+    initdb = shutil.which('initdb')
+    if initdb:
+        return os.path.dirname(initdb)
+    pg_config = shutil.which('pg_config')
+    if pg_config:
+        return subprocess.run([pg_config, '--bindir'], capture_output=True, text=True, check=True).stdout.strip()
+    return None
+
+
+@pytest.fixture(scope='session')
+def admin_url(tmp_path_factory):
+    """Superuser URL of the server the scratch database is created on"""
+    url = os.getenv('QAMOOS_TEST_DATABASE_URL')
+    if url:
+        yield url
+        return
+
+    bindir = find_bindir()
+    if bindir is None:
+        pytest.skip('No PostgreSQL: set QAMOOS_TEST_DATABASE_URL or put initdb / pg_ctl on PATH')
+
+    cluster = tmp_path_factory.mktemp('pgcluster')
+    data_dir = str(cluster / 'data')
+    pg_ctl = os.path.join(bindir, 'pg_ctl')
+    try:
+        subprocess.run([os.path.join(bindir, 'initdb'), '-D', data_dir, '-U', 'postgres', '-A', 'trust',
+                        '-E', 'UTF8', '--locale=C', '--no-sync'], capture_output=True, text=True, check=True)
+        subprocess.run([pg_ctl, '-D', data_dir, '-l', str(cluster / 'postgres.log'), '-w', '-o',
+                        f"-p {LOCAL_CLUSTER_PORT} -k {cluster} -c listen_addresses='' -c fsync=off", 'start'],
+                       capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        pytest.skip(f'Could not start a local PostgreSQL ({getattr(e, "stderr", None) or e}); '
+                    f'set QAMOOS_TEST_DATABASE_URL instead')
+
+    yield f'postgresql://postgres@/postgres?host={cluster}&port={LOCAL_CLUSTER_PORT}'
+    subprocess.run([pg_ctl, '-D', data_dir, '-m', 'fast', 'stop'], capture_output=True)
+
+
+@pytest.fixture(scope='session')
+def plan_database(admin_url, request):
+    """
+    URL of the scratch database: fixture corpus, every migration (the
+    pg_trgm parts only when the extension is available), JIT and parallel
+    query off and full-sample statistics, so plans are reproducible.
+    Yields (url, has_trgm).
+    """
+    admin = psycopg2.connect(admin_url)
+    admin.autocommit = True
+    with admin.cursor() as cursor:
+        cursor.execute(f'DROP DATABASE IF EXISTS {TEST_DATABASE} WITH (FORCE)')
+        cursor.execute(f"CREATE DATABASE {TEST_DATABASE} TEMPLATE template0 ENCODING 'UTF8' "
+                       f"LC_COLLATE 'C' LC_CTYPE '{TEST_CTYPE}'")
+        cursor.execute(f'ALTER DATABASE {TEST_DATABASE} SET jit = off')
+        cursor.execute(f'ALTER DATABASE {TEST_DATABASE} SET max_parallel_workers_per_gather = 0')
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        has_trgm = cursor.fetchone() is not None
+    if not has_trgm and request.config.getoption('require_trgm'):
+        admin.close()
+        pytest.fail('pg_trgm is not available on the test server (--require-trgm)')
+
+    url = with_database(admin_url, TEST_DATABASE)
+    conn = psycopg2.connect(url)
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        with open(os.path.join(FIXTURES_DIR, 'corpus.sql'), encoding='utf-8') as f:
+            cursor.execute(f.read())
+
+        for path in sorted(glob.glob(os.path.join(MIGRATIONS_DIR, '*.sql'))):
+            with open(path, encoding='utf-8') as f:
+                for statement in split_sql(f.read()):
+                    if not has_trgm and ('pg_trgm' in statement or 'gin_trgm_ops' in statement):
+                        continue
+                    cursor.execute(statement)
+
+        cursor.execute('SET default_statistics_target = 1000')
+        cursor.execute('VACUUM (ANALYZE)')
+    conn.close()
+
+    yield url, has_trgm
+
+    with admin.cursor() as cursor:
+        cursor.execute(f'DROP DATABASE IF EXISTS {TEST_DATABASE} WITH (FORCE)')
+    admin.close()
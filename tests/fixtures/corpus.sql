@@ -0,0 +1,166 @@
+-- Fixture corpus for the query-plan regression suite (tests/test_query_plans.py)
+--
+-- The base tables the servers read, with the plain indexes they rely on,
+-- filled with a deterministic synthetic corpus: every word is an md5
+-- digest spelled with 16 Arabic letters, so each run (and each machine)
+-- loads byte-identical data and gets the same statistics. The sizes are
+-- large enough for the planner to prefer the indexes a production-sized
+-- database would use. migrations/*.sql are applied on top by the tests.
+
+CREATE FUNCTION fixture_word(seed text, letters integer) RETURNS text
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT translate(substr(md5(seed), 1, letters), '0123456789abcdef', 'ابتثجحخدذرزسشصضط')
+$$;
+
+CREATE FUNCTION fixture_text(seed text, words integer) RETURNS text
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT string_agg(fixture_word(seed || '-' || i, 3 + i % 4), ' ' ORDER BY i)
+    FROM generate_series(1, words) i
+$$;
+
+CREATE TABLE dictionaries (
+    dictionary_id INTEGER PRIMARY KEY,
+    name_arabic TEXT NOT NULL,
+    name_english TEXT,
+    author TEXT,
+    year TEXT
+);
+
+CREATE TABLE chapters (
+    chapter_id SERIAL PRIMARY KEY,
+    dictionary_id INTEGER REFERENCES dictionaries(dictionary_id),
+    name_arabic TEXT,
+    chapter_order INTEGER
+);
+
+CREATE TABLE entries (
+    entry_id INTEGER PRIMARY KEY,
+    dictionary_id INTEGER REFERENCES dictionaries(dictionary_id),
+    root TEXT,
+    headword TEXT,
+    headword_normalized TEXT,
+    page_number INTEGER,
+    entry_order INTEGER,
+    full_text TEXT
+);
+CREATE INDEX idx_entries_headword_normalized ON entries (headword_normalized);
+CREATE INDEX idx_entries_dictionary_id ON entries (dictionary_id);
+
+CREATE TABLE definitions (
+    definition_id SERIAL PRIMARY KEY,
+    entry_id INTEGER REFERENCES entries(entry_id),
+    definition_text TEXT,
+    definition_order INTEGER
+);
+CREATE INDEX idx_definitions_entry ON definitions (entry_id);
+
+CREATE TABLE sub_entries (
+    sub_entry_id INTEGER PRIMARY KEY,
+    parent_entry_id INTEGER REFERENCES entries(entry_id),
+    dictionary_id INTEGER,
+    headword TEXT,
+    headword_normalized TEXT,
+    root TEXT,
+    definition_snippet TEXT
+);
+CREATE INDEX idx_sub_entries_headword_normalized ON sub_entries (headword_normalized);
+
+CREATE TABLE metadata (
+    key TEXT PRIMARY KEY,
+    value TEXT,
+    updated_at TIMESTAMP
+);
+
+CREATE TABLE poets (
+    poet_id INTEGER PRIMARY KEY,
+    name_arabic TEXT,
+    bio_arabic TEXT,
+    poems_count INTEGER
+);
+
+CREATE TABLE poetry_topics (
+    topic_id INTEGER PRIMARY KEY,
+    name_arabic TEXT
+);
+
+CREATE TABLE poetry_meters (
+    meter_id INTEGER PRIMARY KEY,
+    name_arabic TEXT
+);
+
+CREATE TABLE poems (
+    poem_id INTEGER PRIMARY KEY,
+    poet_id INTEGER REFERENCES poets(poet_id),
+    title_arabic TEXT,
+    full_text TEXT,
+    verses_count INTEGER,
+    topic_id INTEGER REFERENCES poetry_topics(topic_id),
+    meter_id INTEGER REFERENCES poetry_meters(meter_id)
+);
+CREATE INDEX idx_poems_poet ON poems (poet_id);
+
+CREATE TABLE verses (
+    verse_id SERIAL PRIMARY KEY,
+    poem_id INTEGER REFERENCES poems(poem_id),
+    verse_number INTEGER,
+    first_hemistich TEXT,
+    second_hemistich TEXT,
+    full_verse TEXT
+);
+CREATE INDEX idx_verses_poem ON verses (poem_id);
+
+-- 9 dictionaries (2, 5 and 9 are the ones whose roots are not displayed)
+INSERT INTO dictionaries (dictionary_id, name_arabic, name_english)
+SELECT d, 'معجم ' || fixture_word('dictionary-' || d, 4), 'Dictionary ' || d
+FROM generate_series(1, 9) d;
+
+INSERT INTO chapters (dictionary_id, name_arabic, chapter_order)
+SELECT d, 'باب ' || fixture_word('chapter-' || d || '-' || c, 3), c
+FROM generate_series(1, 9) d, generate_series(1, 28) c;
+
+-- 24,000 entries; entry_id % 9 = 2 are the كتاب العين (dictionary 3) ones
+INSERT INTO entries (entry_id, dictionary_id, root, headword, headword_normalized, page_number, entry_order, full_text)
+SELECT g, 1 + g % 9, substr(w, 1, 3), w, w, 1 + g / 25, g,
+       w || ' ' || fixture_text('entry-' || g, 24)
+FROM generate_series(1, 24000) g,
+     LATERAL fixture_word('headword-' || g, 3 + g % 4) w;
+
+INSERT INTO definitions (entry_id, definition_text, definition_order)
+SELECT e, fixture_text('definition-' || e || '-' || o, 8), o
+FROM generate_series(1, 24000) e, generate_series(1, 3) o;
+
+INSERT INTO sub_entries (sub_entry_id, parent_entry_id, dictionary_id, headword, headword_normalized, root, definition_snippet)
+SELECT g, 9 * (g % 2600) + 2, 3, w, w, substr(w, 1, 3), fixture_text('sub-entry-' || g, 16)
+FROM generate_series(1, 4000) g,
+     LATERAL fixture_word('sub-headword-' || g, 3 + g % 3) w;
+
+INSERT INTO metadata (key, value, updated_at) VALUES ('data_version', 'plan-fixture', '2024-01-01');
+
+INSERT INTO poets (poet_id, name_arabic, bio_arabic)
+SELECT g, 'شاعر ' || fixture_word('poet-' || g, 5), fixture_text('bio-' || g, 12)
+FROM generate_series(1, 600) g;
+
+INSERT INTO poetry_topics (topic_id, name_arabic)
+SELECT g, fixture_word('topic-' || g, 4) FROM generate_series(1, 12) g;
+
+INSERT INTO poetry_meters (meter_id, name_arabic)
+SELECT g, fixture_word('meter-' || g, 5) FROM generate_series(1, 16) g;
+
+-- 9,000 poems, skewed towards low poet ids, 4 verses each
+INSERT INTO poems (poem_id, poet_id, title_arabic, full_text, verses_count, topic_id, meter_id)
+SELECT g, 1 + (g % 600) * (g % 600) / 600, fixture_text('title-' || g, 3), '', 4, 1 + g % 12, 1 + g % 16
+FROM generate_series(1, 9000) g;
+
+INSERT INTO verses (poem_id, verse_number, first_hemistich, second_hemistich, full_verse)
+SELECT p, v, h1, h2, h1 || ' ' || h2
+FROM generate_series(1, 9000) p, generate_series(1, 4) v,
+     LATERAL fixture_text('verse-' || p || '-' || v || '-a', 4) h1,
+     LATERAL fixture_text('verse-' || p || '-' || v || '-b', 4) h2;
+
+UPDATE poems p SET full_text = v.text
+FROM (SELECT poem_id, string_agg(full_verse, E'\n' ORDER BY verse_number) AS text FROM verses GROUP BY poem_id) v
+WHERE v.poem_id = p.poem_id;
+
+UPDATE poets SET poems_count = c.n
+FROM (SELECT poet_id, COUNT(*) AS n FROM poems GROUP BY poet_id) c
+WHERE c.poet_id = poets.poet_id;
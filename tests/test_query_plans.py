@@ -0,0 +1,503 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Query-plan regression suite
+===========================
+
+Every case below calls one endpoint of server_postgresql.py through the
+Flask test client against the fixture database (see conftest.py),
+records each SQL statement the request runs, and runs it again under
+EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON):
+
+    test_index_usage   the plan uses the listed indexes (the bitmap_scans
+                       ones through a Bitmap Index Scan) and does not
+                       sequentially scan the listed tables
+    test_plan_cost     no statement's estimated cost or shared-buffer
+                       count grew past --plan-tolerance over
+                       fixtures/plan_baseline.json, and the request does
+                       not run more statements than it did
+    test_prepared_plans
+                       the hot statements that run as prepared
+                       statements (CountingCursor.execute_prepared) read
+                       no more buffers, once PostgreSQL may use a cached
+                       generic plan for them, than a plan made for the
+                       actual values, also for skewed values (one-letter
+                       prefixes, misses, batches of hundreds of ids)
+
+Run:
+    QAMOOS_TEST_DATABASE_URL=postgresql://postgres@localhost:5432/postgres python -m pytest tests
+    python -m pytest tests --update-plan-baseline    # after an intended plan change
+
+The baseline is only comparable on the PostgreSQL major version, and with
+or without pg_trgm, that it was recorded with; otherwise test_plan_cost
+is skipped. Cases marked requires_trgm only assert index usage when
+pg_trgm is installed.
+"""
+
+import json
+import os
+import re
+
+import pytest
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'plan_baseline.json')
+
+# Absolute slack on top of the relative tolerance, so tiny plans do not
+# fail on noise (one extra buffer, a fraction of a cost unit)
+COST_SLACK = 5.0
+BUFFER_SLACK = 4
+
+EXPLAINABLE = re.compile(r'^\s*(SELECT|WITH)\b', re.IGNORECASE)
+COPY_QUERY = re.compile(r'^\s*COPY \((.*)\) TO STDOUT', re.IGNORECASE | re.DOTALL)
+
+
+class PlanCase:
+    """One endpoint call and what its plans must look like"""
+
+    def __init__(self, name, path, indexes=(), no_seq_scan=(), requires_trgm=False, json_body=None,
+                 statements=None, bitmap_scans=()):
+        self.name = name
+        self.path = path
+        self.bitmap_scans = frozenset(bitmap_scans)
+        self.indexes = frozenset(indexes) | self.bitmap_scans
+        self.no_seq_scan = frozenset(no_seq_scan)
+        self.requires_trgm = requires_trgm
+        self.json_body = json_body
+        self.statements = statements  # server -> [(sql, params)], for SQL run outside a request
+
+    def __repr__(self):
+        return self.name
+
+
+PLAN_CASES = [
+    # /api/search: both tiers, definitions included, one statement
+    PlanCase('search-exact', '/api/search?q={headword}&mode=exact',
+             indexes={'idx_entries_headword_normalized', 'idx_sub_entries_headword_normalized',
+                      'idx_definitions_entry'},
+             no_seq_scan={'entries', 'sub_entries', 'definitions'}),
+    PlanCase('search-exact-dictionary', '/api/search?q={headword}&mode=exact&dictionary_id=2',
+             indexes={'idx_entries_headword_normalized'},
+             no_seq_scan={'entries', 'definitions'}),
+    PlanCase('search-tier1', '/api/search?q={sub_headword}&mode=exact&dictionary_id=3',
+             indexes={'idx_sub_entries_headword_normalized'},
+             no_seq_scan={'entries', 'sub_entries'}),
+    PlanCase('search-starts', '/api/search?q={prefix}&mode=starts',
+             indexes={'idx_entries_headword_normalized', 'idx_sub_entries_headword_normalized'},
+             no_seq_scan={'entries', 'sub_entries', 'definitions'}),
+    PlanCase('search-fts', '/api/search?q={text_word}&mode=fts',
+             indexes={'idx_entries_search_tsv'},
+             no_seq_scan={'entries', 'definitions'}),
+    PlanCase('search-all', '/api/search?q={headword}&mode=all',
+             bitmap_scans={'idx_entries_headword_normalized_trgm', 'idx_entries_root_trgm',
+                           'idx_entries_full_text_trgm'},
+             indexes={'idx_sub_entries_headword_normalized'},
+             no_seq_scan={'entries', 'sub_entries', 'definitions'}, requires_trgm=True),
+    PlanCase('search-contains', '/api/search?q={headword}&mode=contains',
+             bitmap_scans={'idx_entries_headword_normalized_trgm', 'idx_entries_root_trgm',
+                           'idx_entries_full_text_trgm'},
+             no_seq_scan={'entries', 'definitions'}, requires_trgm=True),
+    PlanCase('search-all-similarity', '/api/search?q={headword}&mode=all&sort=similarity',
+             bitmap_scans={'idx_entries_headword_normalized_trgm', 'idx_entries_root_trgm',
+                           'idx_entries_full_text_trgm'},
+             no_seq_scan={'entries', 'definitions'}, requires_trgm=True),
+    PlanCase('search-ndjson', '/api/search?q={prefix}&mode=starts&format=ndjson',
+             indexes={'idx_entries_headword_normalized', 'idx_sub_entries_headword_normalized',
+                      'idx_definitions_entry'},
+             no_seq_scan={'entries', 'sub_entries', 'definitions'}),
+
+    PlanCase('lookup-batch', '/api/lookup/batch',
+             json_body={'words': ['{headword}', '{sub_headword}', '{text_word}', 'ال{headword}']},
+             indexes={'idx_entries_headword_normalized', 'idx_sub_entries_headword_normalized',
+                      'idx_definitions_entry'},
+             no_seq_scan={'entries', 'sub_entries', 'definitions'}),
+    PlanCase('suggest-index', '/api/suggest?q={prefix}',
+             statements=lambda server: [(server.HEADWORD_INDEX_SQL, None)]),
+    PlanCase('entry', '/api/entry/1000',
+             indexes={'entries_pkey', 'idx_definitions_entry'},
+             no_seq_scan={'entries', 'definitions'}),
+    PlanCase('dictionaries', '/api/dictionaries'),
+    PlanCase('stats', '/api/stats'),
+    PlanCase('stats-dictionary', '/api/stats?dictionary_id=3'),
+    PlanCase('chapters', '/api/chapters?dictionary_id=3'),
+
+    PlanCase('poets', '/api/poets?limit=20',
+             indexes={'idx_poets_popularity'}, no_seq_scan={'poets'}),
+    PlanCase('poets-after', '/api/poets?limit=20&after={poets_after}',
+             indexes={'idx_poets_popularity'}, no_seq_scan={'poets'}),
+    PlanCase('poets-search', '/api/poets?q={poet_name}'),
+    PlanCase('poet', '/api/poet/3',
+             indexes={'poets_pkey', 'idx_poems_poet_id_poem_id'}, no_seq_scan={'poets', 'poems'}),
+    PlanCase('poems', '/api/poems?limit=20',
+             indexes={'poems_pkey'}, no_seq_scan={'poems'}),
+    PlanCase('poems-poet', '/api/poems?poet_id=2&limit=20',
+             indexes={'idx_poems_poet_id_poem_id'}, no_seq_scan={'poems'}),
+    PlanCase('poems-after', '/api/poems?limit=20&after={poems_after}',
+             indexes={'poems_pkey'}, no_seq_scan={'poems'}),
+    PlanCase('poem', '/api/poem/120?annotate=1',
+             indexes={'poems_pkey', 'idx_verses_poem', 'token_entries_pkey'},
+             no_seq_scan={'poems', 'verses', 'token_entries'}),
+    PlanCase('poetry-search', '/api/poetry/search?q={verse_word}',
+             bitmap_scans={'idx_verses_full_verse_normalized_trgm', 'idx_poems_title_normalized_trgm'},
+             no_seq_scan={'verses', 'poems'}, requires_trgm=True),
+
+    PlanCase('export-dictionary', '/api/export/dictionary/3?gzip=0',
+             indexes={'idx_definitions_entry'}, no_seq_scan={'definitions'}),
+    PlanCase('export-poet', '/api/export/poet/2?gzip=0&format=ndjson',
+             indexes={'idx_verses_poem'}, no_seq_scan={'verses'}),
+]
+
+# Words and cursors from the fixture corpus, substituted into PlanCase paths
+FIXTURE_VALUES_SQL = {
+    'headword': 'SELECT headword_normalized FROM entries WHERE entry_id = 1000',
+    'prefix': 'SELECT left(headword_normalized, 3) FROM entries WHERE entry_id = 1003',
+    'text_word': "SELECT split_part(full_text, ' ', 6) FROM entries WHERE entry_id = 2000",
+    'sub_headword': 'SELECT headword_normalized FROM sub_entries WHERE sub_entry_id = 10',
+    'verse_word': "SELECT split_part(full_verse, ' ', 3) FROM verses WHERE poem_id = 100 AND verse_number = 2",
+    'poet_name': "SELECT split_part(name_arabic, ' ', 2) FROM poets WHERE poet_id = 7",
+}
+
+
+def fill_values(value, values):
+    """Substitute FIXTURE_VALUES_SQL placeholders in the strings of a JSON body"""
+    if isinstance(value, str):
+        return value.format(**values)
+    if isinstance(value, list):
+        return [fill_values(v, values) for v in value]
+    if isinstance(value, dict):
+        return {k: fill_values(v, values) for k, v in value.items()}
+    return value
+
+
+def plan_nodes(node):
+    """Every node of an EXPLAIN (FORMAT JSON) plan tree, sub- and init-plans included"""
+    yield node
+    for child in node.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+def describe_scans(plan):
+    scans = set()
+    for node in plan_nodes(plan):
+        target = node.get('Index Name') or node.get('Relation Name')
+        if target:
+            scans.add(f"{node['Node Type']} {target}")
+    return sorted(scans)
+
+
+@pytest.fixture(scope='session')
+def server(plan_database):
+    """server_postgresql pointed at the fixture database"""
+    import server_postgresql
+
+    server_postgresql.DATABASE_URL = plan_database[0]
+    server_postgresql.DATA_VERSION_CHECK_INTERVAL = 3600  # read once, not in the middle of a case
+    server_postgresql._pool = None
+    with server_postgresql.app.test_request_context():
+        server_postgresql.get_data_version()
+    return server_postgresql
+
+
+@pytest.fixture(scope='session')
+def recorded_statements(server):
+    """List that every statement the server executes (or COPYs) is appended to, as (sql, params)"""
+    import psycopg2.extensions
+
+    recorded = []
+    original_execute = server.CountingCursor.execute
+    original_execute_prepared = server.CountingCursor.execute_prepared
+
+    def execute(self, query, vars=None):
+        recorded.append((query, vars))
+        return original_execute(self, query, vars)
+
+    def execute_prepared(self, query, vars=None):
+        recorded.append((query, vars))
+        return original_execute_prepared(self, query, vars)
+
+    def copy_expert(self, sql, file, size=8192):
+        recorded.append((sql, None))
+        return psycopg2.extensions.cursor.copy_expert(self, sql, file, size)
+
+    patch = pytest.MonkeyPatch()
+    patch.setattr(server.CountingCursor, 'execute', execute)
+    patch.setattr(server.CountingCursor, 'execute_prepared', execute_prepared)
+    patch.setattr(server.CountingCursor, 'copy_expert', copy_expert)
+    yield recorded
+    patch.undo()
+
+
+@pytest.fixture(scope='session')
+def explain_conn(plan_database):
+    import psycopg2
+
+    conn = psycopg2.connect(plan_database[0])
+    conn.autocommit = True
+    yield conn
+    conn.close()
+
+
+@pytest.fixture(scope='session')
+def fixture_values(server, explain_conn):
+    values = {}
+    with explain_conn.cursor() as cursor:
+        for name, sql in FIXTURE_VALUES_SQL.items():
+            cursor.execute(sql)
+            values[name] = cursor.fetchone()[0]
+        cursor.execute(f'SELECT {server.POETS_SORT_KEY}, poet_id FROM poets ORDER BY 1, 2 OFFSET 19 LIMIT 1')
+        values['poets_after'] = server.encode_cursor(*cursor.fetchone())
+    values['poems_after'] = server.encode_cursor(5000)
+    return values
+
+
+@pytest.fixture(scope='session')
+def explained(server, recorded_statements, explain_conn, fixture_values, plan_database):
+    """explained(case) -> [{'sql', 'cost', 'buffers', 'scans', 'plan'}] for each statement, cached per session"""
+    has_trgm = plan_database[1]
+    client = server.app.test_client()
+    cache = {}
+
+    def run_case(case):
+        recorded_statements.clear()
+        path = case.path.format(**fixture_values)
+        if case.json_body is not None:
+            response = client.post(path, json=fill_values(case.json_body, fixture_values))
+        else:
+            response = client.get(path)
+        response.get_data()  # drain streamed bodies (ndjson, exports)
+        if response.status_code != 200:
+            if case.requires_trgm and not has_trgm:
+                pytest.skip(f'{case.name} needs pg_trgm')
+            pytest.fail(f'{path} returned {response.status_code}: {response.get_data(as_text=True)[:300]}')
+
+        statements = case.statements(server) if case.statements else list(recorded_statements)
+        results = []
+        with explain_conn.cursor() as cursor:
+            for sql, params in statements:
+                copy = COPY_QUERY.match(sql)
+                if copy:
+                    sql = copy.group(1)
+                if not EXPLAINABLE.match(sql):
+                    continue
+                cursor.execute(sql, params)  # warm the cache, so buffers are all hits
+                cursor.fetchall()
+                cursor.execute('EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) ' + sql, params)
+                plan = cursor.fetchone()[0][0]['Plan']
+                results.append({
+                    'sql': ' '.join(sql.split())[:120],
+                    'cost': round(plan['Total Cost'], 2),
+                    'buffers': plan.get('Shared Hit Blocks', 0) + plan.get('Shared Read Blocks', 0),
+                    'scans': describe_scans(plan),
+                    'plan': plan,
+                })
+        assert results, f'{case.name} ran no SQL'
+        return results
+
+    def explained(case):
+        if case.name not in cache:
+            cache[case.name] = run_case(case)
+        return cache[case.name]
+
+    return explained
+
+
+class PlanBaseline:
+    """
+    fixtures/plan_baseline.json: one baseline per environment (PostgreSQL
+    major version, pg_trgm or not), each holding per case the cost,
+    buffers and scans of each statement. Re-recording replaces only the
+    current environment's baseline.
+    """
+
+    def __init__(self, path, environment, update):
+        self.path = path
+        self.environment = environment
+        self.update = update
+        self.baselines = []
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.baselines = json.load(f).get('baselines', [])
+        current = [b['cases'] for b in self.baselines if b['environment'] == environment]
+        self.comparable = bool(current) and not update
+        self.cases = {} if update or not current else current[0]
+
+    def record(self, name, statements):
+        self.cases[name] = [{k: s[k] for k in ('sql', 'cost', 'buffers', 'scans')} for s in statements]
+
+    def save(self):
+        baselines = [b for b in self.baselines if b['environment'] != self.environment]
+        baselines.append({'environment': self.environment, 'cases': dict(sorted(self.cases.items()))})
+        baselines.sort(key=lambda b: (b['environment']['postgres'], b['environment']['pg_trgm']))
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'baselines': baselines}, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+
+
+@pytest.fixture(scope='session')
+def plan_baseline(request, explain_conn, plan_database):
+    with explain_conn.cursor() as cursor:
+        cursor.execute('SHOW server_version_num')
+        major = int(cursor.fetchone()[0]) // 10000
+    environment = {'postgres': major, 'pg_trgm': plan_database[1]}
+    baseline = PlanBaseline(BASELINE_PATH, environment, request.config.getoption('update_plan_baseline'))
+    yield baseline
+    if baseline.update:
+        baseline.save()
+
+
+@pytest.mark.parametrize('case', PLAN_CASES, ids=repr)
+def test_index_usage(case, explained, plan_database):
+    if case.requires_trgm and not plan_database[1]:
+        pytest.skip('pg_trgm is not installed; the trigram indexes of migrations/001 and 006 are missing')
+    if not (case.indexes or case.no_seq_scan):
+        pytest.skip('no index expectations')
+
+    statements = explained(case)
+    nodes = [node for s in statements for node in plan_nodes(s['plan'])]
+    used = {node['Index Name'] for node in nodes if 'Index Name' in node}
+    seq_scanned = {node['Relation Name'] for node in nodes if node['Node Type'] == 'Seq Scan'}
+    scans = '\n'.join(f"  {s['sql']}\n    {', '.join(s['scans'])}" for s in statements)
+
+    missing = case.indexes - used
+    assert not missing, f"{case.name} no longer uses {', '.join(sorted(missing))}:\n{scans}"
+    bitmap = {node['Index Name'] for node in nodes if node['Node Type'] == 'Bitmap Index Scan'}
+    not_bitmap = case.bitmap_scans - bitmap
+    assert not not_bitmap, f"{case.name} no longer bitmap-scans {', '.join(sorted(not_bitmap))}:\n{scans}"
+    unexpected = case.no_seq_scan & seq_scanned
+    assert not unexpected, f"{case.name} sequentially scans {', '.join(sorted(unexpected))}:\n{scans}"
+
+
+@pytest.mark.parametrize('case', PLAN_CASES, ids=repr)
+def test_plan_cost(case, explained, plan_baseline, request):
+    statements = explained(case)
+    if plan_baseline.update:
+        plan_baseline.record(case.name, statements)
+        return
+    if not plan_baseline.comparable:
+        pytest.skip(f'plan_baseline.json was not recorded on {plan_baseline.environment}; '
+                    f'run with --update-plan-baseline')
+    expected = plan_baseline.cases.get(case.name)
+    if expected is None:
+        pytest.skip(f'{case.name} is not in plan_baseline.json; run with --update-plan-baseline')
+
+    tolerance = request.config.getoption('plan_tolerance')
+    assert len(statements) <= len(expected), (
+        f"{case.name} runs {len(statements)} statements, the baseline {len(expected)}:\n"
+        + '\n'.join(f"  {s['sql']}" for s in statements))
+
+    regressions = []
+    for actual, base in zip(statements, expected):
+        if actual['cost'] > base['cost'] * (1 + tolerance) + COST_SLACK:
+            regressions.append(f"cost {base['cost']} -> {actual['cost']}")
+        if actual['buffers'] > base['buffers'] * (1 + tolerance) + BUFFER_SLACK:
+            regressions.append(f"buffers {base['buffers']} -> {actual['buffers']}")
+        if regressions:
+            pytest.fail(f"{case.name}: {', '.join(regressions)} (tolerance {tolerance:.0%})\n"
+                        f"  {actual['sql']}\n"
+                        f"  was: {', '.join(base['scans'])}\n"
+                        f"  now: {', '.join(actual['scans'])}")
+
+
+class PreparedCase:
+    """
+    One hot statement run through CountingCursor.execute_prepared:
+    statement(server, value) -> (sql, params), with values from the
+    prepared_values fixture: values[0] to warm it up, values[1] skewed
+    """
+
+    def __init__(self, name, values, statement):
+        self.name = name
+        self.values = values
+        self.statement = statement
+
+    def __repr__(self):
+        return self.name
+
+
+PREPARED_CASES = [
+    PreparedCase('search-exact', 'words', lambda server, q: server.build_search_query(q, None, 'exact', 50)),
+    PreparedCase('search-exact-dictionary', 'words', lambda server, q: server.build_search_query(q, '2', 'exact', 50)),
+    PreparedCase('search-starts', 'prefixes', lambda server, q: server.build_search_query(q, None, 'starts', 50)),
+    PreparedCase('search-starts-dictionary', 'prefixes',
+                 lambda server, q: server.build_search_query(q, '3', 'starts', 50)),
+    PreparedCase('search-fts', 'text_words', lambda server, q: server.build_search_query(q, None, 'fts', 50)),
+    PreparedCase('search-all', 'substrings', lambda server, q: server.build_search_query(q, None, 'all', 50)),
+    PreparedCase('search-all-dictionary', 'substrings',
+                 lambda server, q: server.build_search_query(q, '5', 'all', 50)),
+    PreparedCase('tier1', 'words', lambda server, q: server.build_tier1_query(q, 'all', 50)),
+    PreparedCase('entry', 'entry_ids', lambda server, entry_id: (server.ENTRY_SQL, (entry_id,))),
+    PreparedCase('entry-definitions', 'entry_ids', lambda server, entry_id: (server.ENTRY_DEFINITIONS_SQL, (entry_id,))),
+    PreparedCase('definitions-batch', 'id_batches',
+                 lambda server, ids: (server.DEFINITIONS_BATCH_SQL, (ids, server.SEARCH_DEFINITIONS_PER_ENTRY))),
+]
+
+# More executions than PostgreSQL's plan cache makes custom plans for (5)
+# before it starts weighing a generic one
+PREPARED_WARMUP = 8
+
+# A generic plan may reach an empty result through another index (the
+# pg_trgm one for a prefix nothing starts with): a few pages either way
+PREPARED_BUFFER_SLACK = 8
+
+
+@pytest.fixture(scope='session')
+def prepared_values(explain_conn):
+    """PreparedCase.values key -> (warm-up values, skewed values)"""
+    with explain_conn.cursor() as cursor:
+        cursor.execute('SELECT headword_normalized FROM entries WHERE entry_id %% 1000 = 0 '
+                       'ORDER BY entry_id LIMIT %s', (PREPARED_WARMUP,))
+        words = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SELECT split_part(full_text, ' ', 4) FROM entries WHERE entry_id %% 1000 = 7 "
+                       "ORDER BY entry_id LIMIT %s", (PREPARED_WARMUP,))
+        text_words = [row[0] for row in cursor.fetchall()]
+        cursor.execute('SELECT headword_normalized FROM entries WHERE entry_id = 1003')
+        long_word = cursor.fetchone()[0]
+    missing = 'غغغغغ'  # no fixture word has these letters
+    return {
+        'words': (words, [words[0][:1], words[0][:2], missing]),
+        'prefixes': ([w[:3] for w in words], [words[0][:1], words[0][:2], words[0], missing]),
+        'text_words': (text_words, [text_words[0][:1], f'{text_words[0]} {text_words[1]}', missing]),
+        # Three letters at least: run_search() runs shorter contains searches unprepared
+        'substrings': (words, [long_word[1:4], long_word[-3:], missing]),
+        'entry_ids': ([1000 + 7 * i for i in range(PREPARED_WARMUP)], [1, 23999, 999999]),
+        'id_batches': ([[1000 + 10 * i + j for j in range(10)] for i in range(PREPARED_WARMUP)],
+                       [[1], list(range(1, 301)), []]),
+    }
+
+
+@pytest.mark.parametrize('case', PREPARED_CASES, ids=repr)
+def test_prepared_plans(case, server, plan_database, prepared_values, request):
+    import psycopg2
+    import psycopg2.extensions
+
+    warmup, skewed = prepared_values[case.values]
+    tolerance = request.config.getoption('plan_tolerance')
+    conn = psycopg2.connect(plan_database[0], connection_factory=server.PreparingConnection,
+                            cursor_factory=server.CountingCursor)
+    conn.autocommit = True
+    try:
+        cursor = conn.cursor()
+        for value in warmup:
+            cursor.execute_prepared(*case.statement(server, value))
+            cursor.fetchall()
+
+        plain = conn.cursor(cursor_factory=psycopg2.extensions.cursor)
+        for value in skewed:
+            sql, params = case.statement(server, value)
+            name = conn.prepared[sql]
+            placeholders = ', '.join(['%s'] * len(params))
+            plans = {}
+            for kind, statement in (('custom', sql), ('prepared', f'EXECUTE {name} ({placeholders})')):
+                plain.execute(statement, params)  # warm the cache, so buffers are all hits
+                plain.execute('EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) ' + statement, params)
+                plans[kind] = plain.fetchone()[0][0]['Plan']
+            buffers = {kind: plan.get('Shared Hit Blocks', 0) + plan.get('Shared Read Blocks', 0)
+                       for kind, plan in plans.items()}
+            plain.execute('SELECT generic_plans FROM pg_prepared_statements WHERE name = %s', (name,))
+            generic_plans = plain.fetchone()[0]
+            assert buffers['prepared'] <= buffers['custom'] * (1 + tolerance) + PREPARED_BUFFER_SLACK, (
+                f"{case.name} with {value!r}: {buffers['prepared']} buffers prepared "
+                f"({generic_plans} generic plans so far), {buffers['custom']} planned for the value\n"
+                f"  custom:   {', '.join(describe_scans(plans['custom']))}\n"
+                f"  prepared: {', '.join(describe_scans(plans['prepared']))}")
+    finally:
+        conn.close()